@@ -1,22 +1,39 @@
-from fastapi import FastAPI, Request, HTTPException
+from fastapi import FastAPI, Request, HTTPException, Header, Depends
 from fastapi.middleware.cors import CORSMiddleware
-import redis
 import os
 import json
+import time
 import re
+import hmac
+import uuid
 import logging
 from pydantic import BaseModel
 from dotenv import load_dotenv
 from pymongo import MongoClient
-from typing import List, Optional, Dict, Any, Generator
+from typing import List, Optional, Dict, Any, Tuple
 import asyncio
-import google.generativeai as genai
 import numpy as np
-from collections import defaultdict
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse, PlainTextResponse
+import config
+import embedding_client
 from embedding_client import encode_texts
-from pinecone_client import query_vector
-from langdetect import detect, DetectorFactory
+from pinecone_client import query_vector, fetch_vectors
+from documents import INDEXED_FIELDS, document_fields
+from document_index import document_chunk_ids, index_documents
+from utils import record_webhook_payload, record_ingest_metrics
+from redis_connection import get_redis
+import serialization
+from language_detection import detect_language
+from translation import (translate_text, content_preview, get_pretranslations, pretranslate_documents,
+                         queue_pretranslation, drain_pretranslation_queue,
+                         PRETRANSLATE_LANGS, PRETRANSLATE_POLL_INTERVAL, PRETRANSLATE_QUEUE_KEY)
+from query_log import (log_query, normalize_query, request_fields, top_queries, track_cached_request,
+                       pop_requests_for_documents, mark_document_updated, mark_documents_updated,
+                       pop_updated_documents, STALE_DOCS_KEY, QUERY_LOG_STREAM)
+from degradation import SearchBudget, stage_tracker
+from candidates import CandidateSet, DocumentSet
+from tenants import TenantConfig, TenantRegistry
+import profiling
 
 # Load cross-encoder for reranking
 try:
@@ -62,36 +79,45 @@ logger = logging.getLogger(__name__)
 # -------------------------------
 # Configuration
 # -------------------------------
-REDIS_HOST = os.getenv("REDIS_HOST", "localhost")
-REDIS_PORT = int(os.getenv("REDIS_PORT", 6379))
-REDIS_DB = int(os.getenv("REDIS_DB", 0))
 REDIS_TTL = int(os.getenv("REDIS_TTL", 3600))
 MONGO_URI = os.getenv("MONGO_URI", "mongodb://localhost:27017")
 DB_NAME = os.getenv("DB_NAME", "techsurf")
+DOCUMENT_COLLECTION = os.getenv("DOCUMENT_COLLECTION", "documents")  # source of /reindex/all and change_stream.py
+REINDEX_BATCH_SIZE = int(os.getenv("REINDEX_BATCH_SIZE", 64))  # documents per encode call
 
 # Search configuration
 MIN_SCORE_THRESHOLD = float(os.getenv("MIN_SCORE_THRESHOLD", -15))
 INITIAL_CANDIDATES = int(os.getenv("INITIAL_CANDIDATES", 50))
 RERANK_ENABLED = os.getenv("RERANK_ENABLED", "true").lower() == "true"
-CHUNK_SIZE = int(os.getenv("CHUNK_SIZE", 200))  # Words per chunk
+AGGREGATION_MODE = os.getenv("AGGREGATION_MODE", "max")  # "max" or "sum" of chunk scores per document
+TITLE_BOOST = float(os.getenv("TITLE_BOOST", 1.5))  # title chunk weight in "sum" mode
+
+# Cache warm-up configuration
+WARMUP_TOP_N = int(os.getenv("WARMUP_TOP_N", 200))  # head queries replayed before /ready, 0 disables
+WARMUP_CONCURRENCY = int(os.getenv("WARMUP_CONCURRENCY", 4))
+WARMUP_TIMEOUT = float(os.getenv("WARMUP_TIMEOUT", 120))  # seconds before reporting ready regardless
+WARMUP_LATENCY_BUDGET_MS = int(os.getenv("WARMUP_LATENCY_BUDGET_MS", 60000))  # warm-up runs the full pipeline
+REWARM_INTERVAL = float(os.getenv("REWARM_INTERVAL", 5))  # seconds between stale-document polls
 
 # LLM configuration for query expansion
 LLM_API_KEY = os.getenv("LLM_API_KEY")
 LLM_API_URL = os.getenv("LLM_API_URL", "https://api.openai.com/v1/chat/completions")
 LLM_MODEL = os.getenv("LLM_MODEL", "gpt-3.5-turbo")
 LLM_ENABLED = os.getenv("LLM_ENABLED", "false").lower() == "true" and LLM_API_KEY
-GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
-genai.configure(api_key=GEMINI_API_KEY)
-GEMINI_MODEL = "gemini-1.5-pro"
-DetectorFactory.seed = 0
 
 # -------------------------------
 # Service Connections
 # -------------------------------
-redis_client = redis.StrictRedis(host=REDIS_HOST, port=REDIS_PORT, db=REDIS_DB)
+redis_client = get_redis()
 mongo_client = MongoClient(MONGO_URI)
 db = mongo_client[DB_NAME]
 config_collection = db["configs"]
+documents_collection = db[DOCUMENT_COLLECTION]
+tenant_registry = TenantRegistry(config_collection, redis_client)
+
+@app.on_event("startup")
+async def start_tenant_invalidation_listener():
+    tenant_registry.start_invalidation_listener()
 
 
 # -------------------------------
@@ -102,69 +128,6 @@ def strip_html_tags(text: str) -> str:
     clean = re.compile("<.*?>")
     return re.sub(clean, "", text or "").strip()
 
-def chunk_text(text: str, chunk_size: int = 200) -> Generator[str, None, None]:
-    """
-    Split text into chunks of approximately chunk_size words.
-    """
-    if not text:
-        return
-    
-    words = text.split()
-    for i in range(0, len(words), chunk_size):
-        yield " ".join(words[i:i + chunk_size])
-
-def normalize_vector(vec: np.ndarray) -> np.ndarray:
-    """Normalize vector to unit length for consistent cosine similarity."""
-    norm = np.linalg.norm(vec)
-    if norm == 0:
-        return vec
-    return vec / norm
-
-async def prepare_document_vectors(uid: str, title: str, body: str, locale: str, content_type: str) -> List[Dict]:
-    """
-    Prepare chunked embeddings for a document with title and body chunks.
-    """
-    vectors = []
-    
-    # Encode and add title as separate chunk
-    if title:
-        title_vec = encode_texts([title])[0]
-        title_vec_normalized = normalize_vector(title_vec)
-        vectors.append({
-            "id": f"{uid}_title",
-            "values": title_vec_normalized.tolist(),
-            "metadata": {
-                "doc_id": uid,
-                "title": title,
-                "chunk_type": "title",
-                "locale": locale,
-                "content_type": content_type,
-                "text": title
-            }
-        })
-    
-    # Encode body in chunks
-    if body:
-        for chunk_idx, chunk in enumerate(chunk_text(body, CHUNK_SIZE)):
-            chunk_vec = encode_texts([chunk])[0]
-            chunk_vec_normalized = normalize_vector(chunk_vec)
-            vectors.append({
-                "id": f"{uid}_body_{chunk_idx}",
-                "values": chunk_vec_normalized.tolist(),
-                "metadata": {
-                    "doc_id": uid,
-                    "title": title,
-                    "chunk_type": "body",
-                    "chunk_index": chunk_idx,
-                    "locale": locale,
-                    "content_type": content_type,
-                    "text": chunk
-                }
-            })
-    
-    logger.info(f"Prepared {len(vectors)} vectors for document {uid}")
-    return vectors
-
 async def llm_query_expansion(query: str) -> List[str]:
     """
     Use LLM to generate intelligent query variations and paraphrases.
@@ -175,7 +138,7 @@ async def llm_query_expansion(query: str) -> List[str]:
     cache_key = f"llm_expansion:{query.lower()}"
     cached = redis_client.get(cache_key)
     if cached:
-        return json.loads(cached)
+        return serialization.loads(cached)
     
     prompt = f"""
     Generate 3-5 semantic search query variations for: "{query}"
@@ -210,7 +173,7 @@ async def llm_query_expansion(query: str) -> List[str]:
                     variations = json.loads(content)
                     if isinstance(variations, list) and all(isinstance(v, str) for v in variations):
                         variations = [query] + variations[:4]  # Keep 4 LLM variations + original
-                        redis_client.setex(cache_key, REDIS_TTL * 24, json.dumps(variations))
+                        redis_client.setex(cache_key, REDIS_TTL * 24, serialization.dumps(variations))
                         logger.info(f"LLM generated variations: {variations}")
                         return variations
     except Exception as e:
@@ -218,64 +181,6 @@ async def llm_query_expansion(query: str) -> List[str]:
     
     return [query]
 
-async def translate_text(text: str, target_lang: str) -> str:
-    """
-    Translate given text into target_lang using Gemini with strict chat instructions.
-    """
-    if not text or not target_lang or target_lang == "en":
-        return text
-
-    lang_map = {
-        "en": "English",
-        "mr": "Marathi",
-        "hi": "Hindi", 
-        "kn": "Kannada",
-        "ta": "Tamil",
-        "te": "Telugu",
-        "gu": "Gujarati",
-        "bn": "Bengali",
-        "pa": "Punjabi",
-        "ml": "Malayalam",
-        "or": "Odia",
-        "ur": "Urdu",
-        "ne": "Nepali"
-    }
-
-    target_lang_full = lang_map.get(target_lang, "English")
-
-    try:
-        model = genai.GenerativeModel(GEMINI_MODEL)
-        
-        # Start a chat with very clear system instructions
-        chat = model.start_chat(history=[
-            {
-                "role": "user",
-                "parts": ["You are a translation machine. Your only function is to translate text. Never provide explanations, options, or additional text. Only output the translated text."]
-            },
-            {
-                "role": "model", 
-                "parts": ["Understood. I will only output the translated text with no additional content, explanations, or options."]
-            },
-            {
-                "role": "user",
-                "parts": ["Translate 'Hello world' to Hindi"]
-            },
-            {
-                "role": "model",
-                "parts": ["नमस्ते दुनिया"]
-            }
-        ])
-        
-        prompt = f"Translate this to {target_lang_full}: {text}"
-        response = chat.send_message(prompt)
-        translated = response.text.strip()
-        
-        return translated
-
-    except Exception as e:
-        logger.warning(f"Translation failed: {str(e)}")
-        return text
-
 def expand_query_semantically(query: str) -> str:
     """
     Basic semantic expansion for short queries using known patterns.
@@ -305,87 +210,63 @@ def expand_query_semantically(query: str) -> str:
     logger.info(f"Expanded query: '{query}' -> '{expanded_query}'")
     return expanded_query
 
-def aggregate_document_scores(matches: List[Dict]) -> List[Dict]:
+def aggregate_document_scores(matches: List[Dict]) -> DocumentSet:
     """
     Aggregate scores from multiple chunks to document-level scoring.
-    Updated to work with current metadata structure.
+    Uses the max chunk score (or a title-boosted sum, see AGGREGATION_MODE)
+    and keeps the metadata of each document's best-scoring chunk.
     """
-    doc_scores = defaultdict(float)
-    doc_metadata = {}
-    doc_chunk_count = defaultdict(int)
-    
-    for match in matches:
-        metadata = match.get('metadata', {})
-        
-        # Use the document ID from the vector ID (since doc_id is missing)
-        vector_id = match['id']
-        if '_' in vector_id:
-            # Extract doc ID from vector ID like "en-us_blt8f64b5c866280d11"
-            doc_id = vector_id.split('_')[0] + '_' + vector_id.split('_')[1]
-        else:
-            doc_id = vector_id  # Fallback
-            
-        # Use max score for the document
-        doc_scores[doc_id] = max(doc_scores[doc_id], match['score'])
-        doc_chunk_count[doc_id] += 1
-        
-        # Store metadata from the highest scoring chunk
-        if doc_id not in doc_metadata or match['score'] > doc_scores[doc_id]:
-            doc_metadata[doc_id] = metadata
-    
-    # Create final results with document-level scoring
-    aggregated_results = []
-    for doc_id, score in doc_scores.items():
-        aggregated_results.append({
-            'id': doc_id,
-            'score': score,
-            'metadata': doc_metadata[doc_id],
-            'chunk_matches': doc_chunk_count[doc_id]
-        })
-    
-    # Sort by score descending
-    aggregated_results.sort(key=lambda x: x['score'], reverse=True)
-    return aggregated_results
+    candidates = CandidateSet.from_matches(matches)
+    return candidates.aggregate(mode=AGGREGATION_MODE, title_boost=TITLE_BOOST)
 
 
-def rerank_results(query: str, candidates: List[Dict], top_k: int) -> List[Dict]:
+def rerank_results(query: str, candidates: DocumentSet, top_k: int) -> DocumentSet:
     """
     Re-rank search results using cross-encoder for better precision.
     """
-    if not candidates or not RERANK_ENABLED or not RERANKER_AVAILABLE:
-        return candidates[:top_k]
+    return rerank_many([(query, candidates, top_k)])[0]
+
+
+def rerank_many(items: List[Tuple[str, DocumentSet, int]]) -> List[DocumentSet]:
+    """
+    Re-rank several (query, candidates, top_k) items with a single
+    cross-encoder predict call over all query-document pairs.
+    """
+    if not RERANK_ENABLED or not RERANKER_AVAILABLE:
+        return [candidates.top(top_k) for _, candidates, top_k in items]
     
     try:
-        # Prepare document texts for reranking
-        doc_texts = []
-        valid_candidates = []
-        
-        for candidate in candidates:
-            metadata = candidate.get("metadata", {})
-            doc_text = f"{metadata.get('title', '')} {metadata.get('text', '')}".strip()
-            if doc_text:
-                doc_texts.append(doc_text)
-                valid_candidates.append(candidate)
+        # Prepare query-document pairs for every item
+        pairs = []
+        valid_per_item = []
+        for query, candidates, _ in items:
+            doc_texts = candidates.texts()
+            valid = [i for i, doc_text in enumerate(doc_texts) if doc_text]
+            pairs.extend((query, doc_texts[i]) for i in valid)
+            valid_per_item.append(valid)
         
-        if not doc_texts:
-            return candidates[:top_k]
+        if not pairs:
+            return [candidates.top(top_k) for _, candidates, top_k in items]
         
-        # Create query-document pairs for reranking
-        pairs = [(query, doc_text) for doc_text in doc_texts]
+        # Use ONLY reranker score
         reranker_scores = reranker.predict(pairs)
         
-        # Update candidate scores - use ONLY reranker score
-        for i, candidate in enumerate(valid_candidates):
-            candidate["reranker_score"] = float(reranker_scores[i])
-            candidate["final_score"] = candidate["reranker_score"]
+        results = []
+        offset = 0
+        for (_, candidates, top_k), valid in zip(items, valid_per_item):
+            if not valid:
+                results.append(candidates.top(top_k))
+                continue
+            scores = reranker_scores[offset:offset + len(valid)]
+            offset += len(valid)
+            results.append(candidates.take(valid).with_reranker_scores(scores).top(top_k))
         
-        valid_candidates.sort(key=lambda x: x["final_score"], reverse=True)
-        logger.info(f"Reranked {len(valid_candidates)} candidates")
-        return valid_candidates[:top_k]
+        logger.info(f"Reranked {len(pairs)} candidates for {len(items)} queries")
+        return results
         
     except Exception as e:
         logger.error(f"Reranking failed: {str(e)}")
-        return candidates[:top_k]
+        return [candidates.top(top_k) for _, candidates, top_k in items]
 
 # -------------------------------
 # Webhook API (Updated for chunked embeddings)
@@ -394,6 +275,7 @@ def rerank_results(query: str, candidates: List[Dict], top_k: int) -> List[Dict]
 async def webhook_receiver(request: Request):
     payload = await request.json()
     logger.info(f"📩 Webhook received: {payload}")
+    record_webhook_payload(payload)
 
     try:
         event = payload.get("event")
@@ -412,13 +294,20 @@ async def webhook_receiver(request: Request):
             logger.warning("⚠️ Skipping: missing uid, title, or body")
             return {"status": "skipped"}
 
-        # Prepare chunked embeddings
-        vectors = await prepare_document_vectors(uid, title, body, locale, content_type)
-        
-        # Upsert to Pinecone
-        if vectors:
-            upsert_vectors(vectors)
-            logger.info(f"✅ Successfully upserted {len(vectors)} chunks for {uid}")
+        # Chunked embeddings, upserted to Pinecone (same path as the change stream)
+        doc = {"uid": uid, "title": title, "body": body, "locale": locale, "content_type": content_type}
+        started_at = time.time()
+        cpu_start = time.process_time()
+        chunks_created = await asyncio.to_thread(
+            index_documents, [doc], replace_existing=event not in ("create", "entry.create")
+        )
+        record_ingest_metrics(redis_client, "api", uid, event, started_at, started_at,
+                              (time.process_time() - cpu_start) * 1000)
+        if chunks_created:
+            logger.info(f"✅ Successfully upserted {chunks_created} chunks for {uid}")
+            # Translated under the uid returned in hits, batched by drain_pretranslations
+            queue_pretranslation(redis_client, [(uid, title, body)])
+            mark_document_updated(redis_client, uid)
 
         # Also store in Redis queue for backup processing
         job = {
@@ -428,10 +317,11 @@ async def webhook_receiver(request: Request):
             "body": body,
             "locale": locale,
             "content_type": content_type,
+            "enqueued_at": time.time(),
         }
-        redis_client.rpush("contentstack_jobs", json.dumps(job))
+        redis_client.rpush("contentstack_jobs", serialization.dumps(job))
 
-        return {"status": "success", "chunks_created": len(vectors), "id": uid}
+        return {"status": "success", "chunks_created": chunks_created, "id": uid}
 
     except Exception as e:
         logger.error(f"❌ Error processing webhook: {str(e)}")
@@ -448,169 +338,822 @@ class SearchRequest(BaseModel):
     top_k: int = 5
     use_reranking: bool = True
     target_lang: Optional[str] = None  # <--- add this line
+    latency_budget_ms: Optional[int] = None  # defaults to SEARCH_LATENCY_BUDGET_MS
+    tenant_id: Optional[str] = None  # Next.js userId, selects the tenant's config
+
+def detect_query_language(query: str) -> str:
+    """Detect the query language (script ranges + cached n-gram model, English by default)."""
+    detected_lang = detect_language(query)
+    logger.info(f"Detected query language: {detected_lang}")
+    return detected_lang
+
+def search_cache_key(req: SearchRequest, target_lang: str) -> str:
+    # Same normalization as the query log, so warm-up replays hit the live request's key
+    return f"search:{req.tenant_id or 'default'}:{normalize_query(req.query)}:{req.top_k}:{req.use_reranking}:{target_lang}"
+
+async def resolve_tenant(req: SearchRequest) -> Tuple[Optional[TenantConfig], SearchRequest]:
+    """
+    Look up the request's tenant (cached) and apply its search settings.
+    Requests without tenant_id use the service-wide configuration.
+    """
+    if not req.tenant_id:
+        return None, req
+    tenant = await tenant_registry.get_async(req.tenant_id)
+    if tenant is None:
+        raise HTTPException(status_code=404, detail="Unknown tenant")
+    if req.use_reranking and not tenant.rerank_enabled:
+        req = req.model_copy(update={"use_reranking": False})
+    return tenant, req
+
+def should_translate(target_lang: str, tenant: Optional[TenantConfig]) -> bool:
+    return target_lang != "en" and (tenant is None or tenant.translation_enabled)
+
+def retrieve_candidates(query: str) -> DocumentSet:
+    """
+    Expand and encode the query, fetch candidates from Pinecone and
+    aggregate them to document level (sorted by vector score).
+    """
+    # Step 2: Expand query
+    expanded_query = expand_query_semantically(query)
+    # Step 3: Encode query
+    query_vec_normalized = encode_texts([expanded_query], normalize=True)[0]
+    return query_candidates(query_vec_normalized)
+
+def query_candidates(query_vec_normalized: np.ndarray) -> DocumentSet:
+    """Fetch candidates for an encoded query and aggregate them to document level."""
+    # Step 4: Query Pinecone
+    res = query_vector(vector=query_vec_normalized, top_k=INITIAL_CANDIDATES)
+    matches = res.get("matches", [])
+    logger.info(f"Raw matches from Pinecone: {len(matches)}")
+
+    if not matches:
+        return DocumentSet.empty()
+
+    # Step 5: Aggregate
+    aggregated_results = aggregate_document_scores(matches)
+    logger.info(f"Aggregated documents: {len(aggregated_results)}")
+    return aggregated_results
+
+def rank_candidates(req: SearchRequest, aggregated_results: DocumentSet,
+                    budget: Optional[SearchBudget] = None, translate: bool = False) -> DocumentSet:
+    """
+    Rerank aggregated candidates when requested, otherwise truncate to top_k.
+    With a budget, the rerank depth shrinks (or reranking is skipped) to fit
+    the remaining time and the current reranker queue depth.
+    """
+    if req.use_reranking and len(aggregated_results) > 1:
+        depth = len(aggregated_results)
+        if budget:
+            depth = budget.rerank_depth(depth, req.top_k, translate)
+        if depth:
+            with stage_tracker.track("rerank", units=depth):
+                final_results = rerank_results(req.query, aggregated_results.top(depth), req.top_k)
+            logger.info(f"🔎 Final results after reranking {depth} candidates: {len(final_results)}")
+            return final_results
+    return aggregated_results.top(req.top_k)
+
+def build_hits(final_results: DocumentSet) -> List[Dict]:
+    """Filter results by MIN_SCORE_THRESHOLD and shape them for the response."""
+    hits = []
+    for r in final_results.to_results():
+        score = r.get("final_score", r["score"])
+        logger.info(f"Result {r['id']} score={score}, threshold={MIN_SCORE_THRESHOLD}")
+        if score >= MIN_SCORE_THRESHOLD:
+            hits.append({
+                "id": r['id'],
+                "score": score,
+                "metadata": dict(r['metadata']),
+                "chunk_matches": r['chunk_matches'],
+                "reranker_score": r.get("reranker_score"),
+                "final_score": score
+            })
+    return hits
+
+async def translate_hit(hit: Dict, target_lang: str) -> Dict:
+    """Translate a hit's title and a content preview in place."""
+    with stage_tracker.track("translate"):
+        return await _translate_hit(hit, target_lang)
+
+async def _translate_hit(hit: Dict, target_lang: str) -> Dict:
+    metadata = hit["metadata"]
+    # Collected first and applied together, so a cancelled hit stays untranslated
+    translated = {}
+
+    # Translate title
+    if 'title' in metadata and metadata['title']:
+        translated['title_translated'] = await translate_text(metadata['title'], target_lang)
+
+    # Translate body/content
+    content_to_translate = metadata.get('body') or metadata.get('text') or metadata.get('title', '')
+    if content_to_translate:
+        # Only translate a preview to avoid long texts
+        translated['content_translated'] = await translate_text(content_preview(content_to_translate), target_lang)
+
+    # Add language info
+    metadata.update(translated, original_language='en', translated_language=target_lang)
+    return hit
+
+async def translate_within_budget(hits: List[Dict], target_lang: str, budget: SearchBudget):
+    """Translate hits concurrently; hits not done when the budget runs out are returned untranslated."""
+    try:
+        await asyncio.wait_for(
+            asyncio.gather(*(translate_hit(hit, target_lang) for hit in hits)),
+            timeout=budget.remaining_ms() / 1000,
+        )
+    except asyncio.TimeoutError:
+        logger.warning(f"⏱️ Translation of {len(hits)} results ran out of budget")
+        budget.degraded.append("translation_timeout")
+
+def apply_pretranslations(hits: List[Dict], target_lang: str) -> List[Dict]:
+    """
+    Fill in translations stored at index time (see translation.py) and
+    return the hits that still need query-time translation.
+    """
+    stored = get_pretranslations(redis_client, [hit["id"] for hit in hits], target_lang)
+    pending = []
+    for hit in hits:
+        entry = stored.get(hit["id"])
+        if not entry:
+            pending.append(hit)
+            continue
+        metadata = hit["metadata"]
+        if entry["title"]:
+            metadata['title_translated'] = entry["title"]
+        if entry["preview"]:
+            metadata['content_translated'] = entry["preview"]
+        metadata['original_language'] = 'en'
+        metadata['translated_language'] = target_lang
+    if stored:
+        logger.info(f"🌐 Used index-time translations for {len(stored)}/{len(hits)} results")
+    return pending
+
+def cache_search_results(cache_key: str, req: SearchRequest, target_lang: str, hits: List[Dict], pipe=None):
+    """
+    Cache hits and index the request under each hit's document for
+    re-warming. Pass a pipeline to batch several writes; it is not executed.
+    """
+    own_pipe = pipe is None
+    pipe = redis_client.pipeline() if own_pipe else pipe
+    pipe.setex(cache_key, REDIS_TTL, serialization.dumps({"results": hits}))
+    track_cached_request(pipe, request_fields(req, target_lang), [hit["id"] for hit in hits], REDIS_TTL)
+    if own_pipe:
+        pipe.execute()
+
+def admit_search(units: int = 1):
+    """Shed load early with a 503 once the hard concurrency cap is reached."""
+    if not stage_tracker.try_admit(units):
+        logger.warning("🚦 Search concurrency cap reached, shedding request")
+        raise HTTPException(status_code=503, detail="Search overloaded, retry later", headers={"Retry-After": "1"})
 
 @app.post("/search")
 async def search(req: SearchRequest):
     if not req.query:
         raise HTTPException(status_code=400, detail="Query required")
 
-    # Step 1: Detect query language FIRST
+    tenant, req = await resolve_tenant(req)
+    admit_search()
     try:
-        detected_lang = detect(req.query)
-        logger.info(f"Detected query language: {detected_lang}")
-    except:
-        detected_lang = "en"
-        logger.warning("Language detection failed, defaulting to English")
+        return await run_search(req, tenant)
+    finally:
+        stage_tracker.release()
+
+async def run_search(req: SearchRequest, tenant: Optional[TenantConfig] = None, refresh: bool = False):
+    """Search pipeline behind /search; refresh=True bypasses the cache read (re-warming)."""
+    started = time.monotonic()
+    budget = SearchBudget(req.latency_budget_ms)
+
+    # Step 1: Detect query language FIRST
+    detected_lang = detect_query_language(req.query)
 
     # Use detected language as target language if none specified
     target_lang = req.target_lang if req.target_lang else detected_lang
     logger.info(f"Target translation language: {target_lang}")
 
-    cache_key = f"search:{req.query.strip().lower()}:{req.top_k}:{req.use_reranking}:{target_lang}"
-    cached = redis_client.get(cache_key)
+    cache_key = search_cache_key(req, target_lang)
+    cached = None if refresh else redis_client.get(cache_key)
     if cached:
         logger.info("⚡ Returning cached search results")
-        return json.loads(cached)
+        log_query(redis_client, req, target_lang, detected_lang, (time.monotonic() - started) * 1000, cached=True)
+        return serialization.loads(cached)
 
     try:
-        # Step 2: Expand query
-        expanded_query = expand_query_semantically(req.query)
-        # Step 3: Encode query
-        query_vec = encode_texts([expanded_query])[0]
-        query_vec_normalized = normalize_vector(query_vec)
-        
-        # Step 4: Query Pinecone
-        res = query_vector(vector=query_vec_normalized.tolist(), top_k=INITIAL_CANDIDATES)
-        matches = res.get("matches", [])
-        logger.info(f"Raw matches from Pinecone: {len(matches)}")
-
-        if not matches:
+        # Steps 2-5: Retrieve, aggregate and rerank (blocking, off the event loop)
+        aggregated_results = await asyncio.to_thread(retrieve_candidates, req.query)
+        if not len(aggregated_results):
             return {"results": []}
-
-        # Step 5: Aggregate and rerank
-        aggregated_results = aggregate_document_scores(matches)
-        logger.info(f"Aggregated documents: {len(aggregated_results)}")
-
-        if req.use_reranking and len(aggregated_results) > 1:
-            final_results = rerank_results(req.query, aggregated_results, req.top_k)
-            logger.info(f"🔎 Final results after reranking: {len(final_results)}")
-        else:
-            final_results = aggregated_results[:req.top_k]
+        translate = should_translate(target_lang, tenant)
+        final_results = await asyncio.to_thread(rank_candidates, req, aggregated_results, budget, translate)
 
         # Step 6: Filter by MIN_SCORE_THRESHOLD
-        hits = []
-        for r in final_results:
-            score = r.get("final_score", r.get("score", 0))
-            logger.info(f"Result {r['id']} score={score}, threshold={MIN_SCORE_THRESHOLD}")
-            if score >= MIN_SCORE_THRESHOLD:
-                hits.append({
-                    "id": r['id'],
-                    "score": score,
-                    "metadata": r['metadata'],
-                    "chunk_matches": r.get('chunk_matches', 0),
-                    "reranker_score": r.get("reranker_score"),
-                    "final_score": score
-                })
+        hits = build_hits(final_results)
 
         # Step 7: Translate results if query language is not English
-        if target_lang != "en" and hits:
-            logger.info(f"Translating results to: {target_lang}")
-            for hit in hits:
-                metadata = hit["metadata"]
-                
-                # Translate title
-                if 'title' in metadata and metadata['title']:
-                    translated_title = await translate_text(metadata['title'], target_lang)
-                    metadata['title_translated'] = translated_title
-                
-                # Translate body/content
-                content_to_translate = metadata.get('body') or metadata.get('text') or metadata.get('title', '')
-                if content_to_translate:
-                    # Only translate a preview to avoid long texts
-                    content_preview = content_to_translate[:200] + "..." if len(content_to_translate) > 200 else content_to_translate
-                    translated_content = await translate_text(content_preview, target_lang)
-                    metadata['content_translated'] = translated_content
-                
-                # Add language info
-                metadata['original_language'] = 'en'
-                metadata['translated_language'] = target_lang
-
-        # Step 8: Cache and return
-        if hits:
-            redis_client.setex(cache_key, REDIS_TTL, json.dumps({"results": hits}))
+        if translate and hits:
+            pending = apply_pretranslations(hits, target_lang)
+            if pending and budget.allow_translation():
+                logger.info(f"Translating {len(pending)} results to: {target_lang}")
+                await translate_within_budget(pending, target_lang, budget)
+
+        # Step 8: Cache and return (degraded results are not cached)
+        if hits and not budget.degraded:
+            cache_search_results(cache_key, req, target_lang, hits)
         
         logger.info(f"✅ Returning {len(hits)} results to client")
+        log_query(redis_client, req, target_lang, detected_lang, (time.monotonic() - started) * 1000, cached=False)
         return {
             "results": hits,
             "query_language": detected_lang,
-            "target_language": target_lang
+            "target_language": target_lang,
+            "degraded": budget.degraded
         }
 
     except Exception as e:
         logger.error(f"❌ Search error: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Search failed: {str(e)}")# -------------------------------
+        raise HTTPException(status_code=500, detail=f"Search failed: {str(e)}")
+
+# -------------------------------
+# Streaming Search API (Server-Sent Events)
+# -------------------------------
+def sse_event(event: str, data: Dict) -> str:
+    """Format a single Server-Sent Event frame."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+class AdmittedStreamingResponse(StreamingResponse):
+    """
+    Streaming response holding a search admission slot. The slot is released
+    however the response ends, including a client that disconnects before
+    the body generator ever starts.
+    """
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            stage_tracker.release()
+
+async def stream_search_events(req: SearchRequest, tenant: Optional[TenantConfig] = None):
+    """
+    Run the /search stages and yield each intermediate result as soon as it
+    is ready: vector ranking, reranked ordering, then per-hit translations.
+    """
+    started = time.monotonic()
+    budget = SearchBudget(req.latency_budget_ms)
+    detected_lang = detect_query_language(req.query)
+    target_lang = req.target_lang if req.target_lang else detected_lang
+    languages = {"query_language": detected_lang, "target_language": target_lang}
+
+    cache_key = search_cache_key(req, target_lang)
+    cached = redis_client.get(cache_key)
+    if cached:
+        logger.info("⚡ Streaming cached search results")
+        log_query(redis_client, req, target_lang, detected_lang, (time.monotonic() - started) * 1000, cached=True)
+        yield sse_event("done", {**serialization.loads(cached), **languages, "cached": True})
+        return
+
+    try:
+        # Encoding and the Pinecone query are blocking, keep the loop free to flush events
+        aggregated_results = await asyncio.to_thread(retrieve_candidates, req.query)
+        if not len(aggregated_results):
+            yield sse_event("done", {"results": [], **languages})
+            return
+
+        yield sse_event("vector_results", {"results": build_hits(aggregated_results.top(req.top_k)), **languages})
+
+        translate = should_translate(target_lang, tenant)
+        if req.use_reranking and len(aggregated_results) > 1:
+            final_results = await asyncio.to_thread(rank_candidates, req, aggregated_results, budget, translate)
+            hits = build_hits(final_results)
+            yield sse_event("reranked", {"results": hits, "degraded": budget.degraded})
+        else:
+            hits = build_hits(aggregated_results.top(req.top_k))
+
+        if translate and hits:
+            pending = apply_pretranslations(hits, target_lang)
+            for hit in hits:
+                if hit not in pending:
+                    yield sse_event("translation", {"id": hit["id"], "metadata": hit["metadata"]})
+            if pending and budget.allow_translation():
+                logger.info(f"Streaming {len(pending)} translations to: {target_lang}")
+                tasks = [asyncio.create_task(translate_hit(hit, target_lang)) for hit in pending]
+                try:
+                    for next_done in asyncio.as_completed(tasks, timeout=budget.remaining_ms() / 1000):
+                        hit = await next_done
+                        yield sse_event("translation", {"id": hit["id"], "metadata": hit["metadata"]})
+                except asyncio.TimeoutError:
+                    logger.warning("⏱️ Streamed translations ran out of budget")
+                    budget.degraded.append("translation_timeout")
+                finally:
+                    for task in tasks:
+                        task.cancel()
+
+        if hits and not budget.degraded:
+            cache_search_results(cache_key, req, target_lang, hits)
+
+        logger.info(f"✅ Streamed {len(hits)} results to client")
+        log_query(redis_client, req, target_lang, detected_lang, (time.monotonic() - started) * 1000, cached=False)
+        yield sse_event("done", {"results": hits, **languages, "degraded": budget.degraded})
+
+    except Exception as e:
+        logger.error(f"❌ Streaming search error: {str(e)}")
+        yield sse_event("error", {"detail": f"Search failed: {str(e)}"})
+
+@app.post("/search/stream")
+async def search_stream(req: SearchRequest):
+    if not req.query:
+        raise HTTPException(status_code=400, detail="Query required")
+
+    tenant, req = await resolve_tenant(req)
+    admit_search()
+    return AdmittedStreamingResponse(
+        stream_search_events(req, tenant),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+# -------------------------------
+# Batch Search API
+# -------------------------------
+BATCH_SEARCH_MAX = int(os.getenv("BATCH_SEARCH_MAX", 1000))
+BATCH_QUERY_CONCURRENCY = int(os.getenv("BATCH_QUERY_CONCURRENCY", 16))
+BATCH_TRANSLATE_CONCURRENCY = int(os.getenv("BATCH_TRANSLATE_CONCURRENCY", 8))  # hits, each up to 2 LLM calls
+
+@app.post("/search/batch")
+async def search_batch(reqs: List[SearchRequest]):
+    """
+    Run many searches in one call for offline jobs. Cache lookups use one
+    MGET, misses are encoded in one batch, vector queries run concurrently
+    and all reranking pairs share one predict call. Results keep input order.
+    """
+    if len(reqs) > BATCH_SEARCH_MAX:
+        raise HTTPException(status_code=400, detail=f"At most {BATCH_SEARCH_MAX} requests per batch")
+
+    # A batch runs up to BATCH_QUERY_CONCURRENCY searches at once and is admitted as that many
+    units = max(1, min(len(reqs), BATCH_QUERY_CONCURRENCY))
+    admit_search(units)
+    try:
+        return {"results": await run_search_batch(reqs)}
+    finally:
+        stage_tracker.release(units)
+
+async def run_search_batch(reqs: List[SearchRequest]) -> List[Dict]:
+    started = time.monotonic()
+    responses: List[Optional[Dict]] = [None] * len(reqs)
+
+    # Step 1: Tenants, languages and cache keys
+    items = []
+    for i, req in enumerate(reqs):
+        if not req.query:
+            responses[i] = {"error": "Query required"}
+            continue
+        try:
+            tenant, req = await resolve_tenant(req)
+        except HTTPException as e:
+            responses[i] = {"error": e.detail}
+            continue
+        detected_lang = detect_query_language(req.query)
+        target_lang = req.target_lang if req.target_lang else detected_lang
+        items.append({
+            "index": i, "req": req, "tenant": tenant,
+            "detected_lang": detected_lang, "target_lang": target_lang,
+            "cache_key": search_cache_key(req, target_lang),
+        })
+    if not items:
+        return responses
+
+    cached_values = redis_client.mget([item["cache_key"] for item in items])
+    misses = {}  # cache_key -> first item; identical requests are computed once
+    for item, cached in zip(items, cached_values):
+        if cached:
+            responses[item["index"]] = serialization.loads(cached)
+            log_query(redis_client, item["req"], item["target_lang"], item["detected_lang"], 0.0, cached=True)
+        else:
+            misses.setdefault(item["cache_key"], item)
+    logger.info(f"⚡ Batch search: {len(items) - len(misses)} cached, {len(misses)} to compute")
+
+    work = list(misses.values())
+    if work:
+        try:
+            # Steps 2-3: Expand and encode all misses in one batch (off the event loop)
+            def encode_batch():
+                expanded = [expand_query_semantically(item["req"].query) for item in work]
+                return encode_texts(expanded, normalize=True)
+
+            query_vecs = await asyncio.to_thread(encode_batch)
+
+            # Steps 4-5: Concurrent vector queries, then aggregation
+            semaphore = asyncio.Semaphore(BATCH_QUERY_CONCURRENCY)
+
+            async def retrieve(vec):
+                async with semaphore:
+                    return await asyncio.to_thread(query_candidates, vec)
+
+            candidate_sets = await asyncio.gather(*(retrieve(vec) for vec in query_vecs))
+
+            # Rerank every item that asks for it with one shared predict call
+            to_rerank = [
+                (n, item) for n, item in enumerate(work)
+                if item["req"].use_reranking and len(candidate_sets[n]) > 1
+            ]
+            final_sets = [docs.top(item["req"].top_k) for docs, item in zip(candidate_sets, work)]
+            if to_rerank:
+                reranked = await asyncio.to_thread(rerank_many, [
+                    (item["req"].query, candidate_sets[n], item["req"].top_k) for n, item in to_rerank
+                ])
+                for (n, _), docs in zip(to_rerank, reranked):
+                    final_sets[n] = docs
+
+            # Steps 6-7: Hits and translations, at most BATCH_TRANSLATE_CONCURRENCY hits at a time
+            translate_semaphore = asyncio.Semaphore(BATCH_TRANSLATE_CONCURRENCY)
+
+            async def translate(hit, target_lang):
+                async with translate_semaphore:
+                    return await translate_hit(hit, target_lang)
+
+            translation_jobs = []
+            for item, docs in zip(work, final_sets):
+                item["hits"] = build_hits(docs)
+                if item["hits"] and should_translate(item["target_lang"], item["tenant"]):
+                    pending = apply_pretranslations(item["hits"], item["target_lang"])
+                    translation_jobs.extend(translate(hit, item["target_lang"]) for hit in pending)
+            if translation_jobs:
+                await asyncio.gather(*translation_jobs)
+
+            # Step 8: Pipelined cache writes
+            pipe = redis_client.pipeline()
+            for item in work:
+                if item["hits"]:
+                    cache_search_results(item["cache_key"], item["req"], item["target_lang"], item["hits"], pipe)
+            pipe.execute()
+        except Exception as e:
+            logger.error(f"❌ Batch search error: {str(e)}")
+            raise HTTPException(status_code=500, detail=f"Search failed: {str(e)}")
+
+    elapsed_ms = (time.monotonic() - started) * 1000
+    for item in items:
+        if responses[item["index"]] is not None:
+            continue
+        computed = misses[item["cache_key"]]
+        responses[item["index"]] = {
+            "results": computed["hits"],
+            "query_language": item["detected_lang"],
+            "target_language": item["target_lang"],
+        }
+        log_query(redis_client, item["req"], item["target_lang"], item["detected_lang"], elapsed_ms, cached=False)
+
+    logger.info(f"✅ Batch search returned {len(responses)} responses")
+    return responses
+
+@app.get("/search/stats")
+async def search_stats():
+    """In-flight counts, stage cost estimates and shed count for this process."""
+    return stage_tracker.snapshot()
+
+# -------------------------------
+# Cache warm-up
+# -------------------------------
+warmup_state = {"ready": WARMUP_TOP_N <= 0, "warmed": 0, "failed": 0}
+
+async def warm_cache(requests: List[Dict], refresh: bool = False) -> Dict:
+    """
+    Replay logged requests through the search pipeline with bounded
+    concurrency so their results land in the cache.
+    """
+    semaphore = asyncio.Semaphore(WARMUP_CONCURRENCY)
+    stats = {"warmed": 0, "failed": 0}
+
+    async def warm(fields: Dict):
+        async with semaphore:
+            try:
+                req = SearchRequest(**fields, latency_budget_ms=WARMUP_LATENCY_BUDGET_MS)
+                tenant, req = await resolve_tenant(req)
+                await run_search(req, tenant, refresh=refresh)
+                stats["warmed"] += 1
+            except Exception as e:
+                logger.warning(f"Warm-up failed for {fields.get('query')!r}: {str(e)}")
+                stats["failed"] += 1
+
+    await asyncio.gather(*(warm(fields) for fields in requests))
+    return stats
+
+async def warm_up_head_queries():
+    """Replay the top WARMUP_TOP_N logged queries, then report ready."""
+    try:
+        head = await asyncio.to_thread(top_queries, redis_client, WARMUP_TOP_N)
+        logger.info(f"🔥 Warming cache with {len(head)} head queries")
+        stats = await asyncio.wait_for(warm_cache(head), timeout=WARMUP_TIMEOUT)
+        warmup_state.update(stats)
+        logger.info(f"🔥 Cache warm-up done: {stats}")
+    except Exception as e:
+        logger.warning(f"Cache warm-up incomplete: {str(e)}")
+    finally:
+        warmup_state["ready"] = True
+
+async def rewarm_updated_documents():
+    """Re-run cached requests whose results contain documents that changed."""
+    while True:
+        try:
+            doc_ids = await asyncio.to_thread(pop_updated_documents, redis_client)
+            if doc_ids:
+                affected = await asyncio.to_thread(pop_requests_for_documents, redis_client, doc_ids)
+                if affected:
+                    stats = await warm_cache(affected, refresh=True)
+                    logger.info(f"♻️ Re-warmed {stats['warmed']} cached queries for {len(doc_ids)} updated documents")
+        except Exception as e:
+            logger.warning(f"Re-warm loop error: {str(e)}")
+        await asyncio.sleep(REWARM_INTERVAL)
+
+def mark_translated(doc_ids: List[str]):
+    mark_documents_updated(redis_client, doc_ids)
+
+async def drain_pretranslations():
+    """
+    Consume PRETRANSLATE_QUEUE_KEY in PRETRANSLATE_BATCH_SIZE batches (one
+    Gemini call each), then re-warm the documents' cached queries.
+    """
+    while True:
+        try:
+            if await asyncio.to_thread(drain_pretranslation_queue, redis_client, mark_translated):
+                continue
+        except Exception as e:
+            logger.warning(f"Pre-translation queue error: {str(e)}")
+        await asyncio.sleep(PRETRANSLATE_POLL_INTERVAL)
+
+background_tasks = set()  # keep references so the tasks are not garbage collected
+
+@app.on_event("startup")
+async def start_cache_warm_up():
+    if WARMUP_TOP_N > 0:
+        background_tasks.add(asyncio.create_task(warm_up_head_queries()))
+    background_tasks.add(asyncio.create_task(rewarm_updated_documents()))
+    if PRETRANSLATE_LANGS:
+        background_tasks.add(asyncio.create_task(drain_pretranslations()))
+
+@app.get("/ready")
+async def ready():
+    """Readiness probe: 503 until the head-query warm-up has finished."""
+    if not warmup_state["ready"]:
+        return JSONResponse(status_code=503, content={"status": "warming", **warmup_state})
+    return {"status": "ready", **warmup_state}
+
+# -------------------------------
 # Re-indexing Endpoint
 # -------------------------------
 @app.post("/reindex/all")
 async def reindex_all_documents():
     """
-    Re-index all documents from MongoDB with proper metadata
+    Re-index all documents from MongoDB with proper metadata.
+    Recovery tool: change_stream.py keeps the index current incrementally.
     """
     try:
-        # Fetch all documents from your collection
-        documents = db.your_collection.find({})  # Replace with your actual collection name
+        documents = documents_collection.find({}, {field: 1 for field in INDEXED_FIELDS})
         
         total_chunks = 0
+        pending_translations = []
+        batch = []
         for doc in documents:
-            vectors = await prepare_document_vectors(
-                doc["uid"],
-                doc.get("title", ""),
-                doc.get("body", ""),
-                doc.get("locale", "en-us"),
-                doc.get("content_type", "unknown")
-            )
-            
-            if vectors:
-                upsert_vectors(vectors)
-                total_chunks += len(vectors)
-                logger.info(f"Re-indexed {doc['uid']} with {len(vectors)} chunks")
+            batch.append(document_fields(doc))
+            if len(batch) >= REINDEX_BATCH_SIZE:
+                total_chunks += await asyncio.to_thread(index_documents, batch)
+                pending_translations.extend((d["uid"], d["title"], d["body"]) for d in batch)
+                batch = []
+        if batch:
+            total_chunks += await asyncio.to_thread(index_documents, batch)
+            pending_translations.extend((d["uid"], d["title"], d["body"]) for d in batch)
+        logger.info(f"Re-indexed {len(pending_translations)} documents with {total_chunks} chunks")
         
-        return {"status": "success", "total_chunks_reindexed": total_chunks}
+        # Optional: translated titles/previews for PRETRANSLATE_LANGS, skipped for unchanged documents
+        translated = await asyncio.to_thread(pretranslate_documents, redis_client, pending_translations)
+        
+        return {"status": "success", "total_chunks_reindexed": total_chunks, "documents_pretranslated": translated}
         
     except Exception as e:
         logger.error(f"Reindexing failed: {str(e)}")
         return {"error": str(e)}
 
 
-# Add this debug endpoint
+# -------------------------------
+# Document inspection API
+# -------------------------------
+DEBUG_AUDIT_CONCURRENCY = int(os.getenv("DEBUG_AUDIT_CONCURRENCY", 8))
+DEBUG_AUDIT_MAX_DOCS = int(os.getenv("DEBUG_AUDIT_MAX_DOCS", 5000))
+NORM_TOLERANCE = 1e-3  # vectors are stored unit-normalized
+
+class DocumentAuditRequest(BaseModel):
+    doc_ids: List[str]
+    include_chunks: bool = False
+
+def inspect_document(doc_id: str) -> Dict:
+    """
+    List a document's title/body chunks by ID prefix, fetch them by ID and
+    report per-chunk metadata, vector norms and consistency issues.
+    """
+    chunk_ids = document_chunk_ids(doc_id)
+    return audit_document(doc_id, chunk_ids, fetch_vectors(chunk_ids))
+
+def audit_document(doc_id: str, chunk_ids: List[str], vectors: Dict) -> Dict:
+    """Consistency report for a document's listed chunk IDs; vectors may hold other documents' chunks too."""
+    chunks = []
+    issues = []
+    body_indices = []
+    for chunk_id in sorted(chunk_ids):
+        vector = vectors.get(chunk_id)
+        if vector is None:
+            issues.append(f"{chunk_id}: listed but not fetchable")
+            continue
+        metadata = vector.metadata or {}
+        norm = float(np.linalg.norm(np.asarray(vector.values, dtype=np.float32)))
+        chunks.append({"id": chunk_id, "norm": norm, "metadata": metadata})
+
+        if abs(norm - 1.0) > NORM_TOLERANCE:
+            issues.append(f"{chunk_id}: vector norm {norm:.4f} is not unit length")
+        if metadata.get("doc_id") not in (None, doc_id):
+            issues.append(f"{chunk_id}: metadata doc_id is {metadata.get('doc_id')}")
+        if metadata.get("chunk_type") == "body":
+            body_indices.append(int(metadata.get("chunk_index", -1)))
+
+    # Untitled documents have no title chunk (see document_chunks)
+    if any(chunk["metadata"].get("title") for chunk in chunks) and f"{doc_id}_title" not in vectors:
+        issues.append("missing title chunk")
+    if sorted(body_indices) != list(range(len(body_indices))):
+        issues.append(f"body chunk indices are not contiguous: {sorted(body_indices)}")
+
+    return {
+        "document_id": doc_id,
+        "chunks_found": len(chunks),
+        "chunks": chunks,
+        "issues": issues,
+    }
+
 @app.get("/debug/document/{doc_id}")
 async def debug_document(doc_id: str):
     """
     Check what chunks exist for a specific document
     """
     try:
-        # Query with a generic vector to find all chunks for this document
-        query_vec = encode_texts(["test"])[0]
-        res = query_vector(vector=query_vec.tolist(), top_k=100)
-        
-        # Filter chunks for this specific document
-        doc_chunks = [
-            match for match in res.get("matches", [])
-            if match['id'].startswith(doc_id) or match.get('metadata', {}).get('doc_id') == doc_id
-        ]
-        
-        return {
-            "document_id": doc_id,
-            "chunks_found": len(doc_chunks),
-            "chunks": [
-                {
-                    "id": chunk["id"],
-                    "score": chunk.get("score", 0),
-                    "metadata": chunk.get("metadata", {})
-                }
-                for chunk in doc_chunks
-            ]
-        }
-        
+        return await asyncio.to_thread(inspect_document, doc_id)
+    except Exception as e:
+        return {"error": str(e)}
+
+@app.post("/debug/documents")
+async def debug_documents(req: DocumentAuditRequest):
+    """
+    Audit index consistency for many documents at once. Chunk IDs are
+    listed per document, then fetched together in FETCH_BATCH_SIZE batches.
+    Per-chunk details are omitted unless include_chunks is set.
+    """
+    if len(req.doc_ids) > DEBUG_AUDIT_MAX_DOCS:
+        raise HTTPException(status_code=400, detail=f"At most {DEBUG_AUDIT_MAX_DOCS} documents per audit")
+    semaphore = asyncio.Semaphore(DEBUG_AUDIT_CONCURRENCY)
+
+    async def list_chunks(doc_id: str):
+        async with semaphore:
+            try:
+                return await asyncio.to_thread(document_chunk_ids, doc_id)
+            except Exception as e:
+                return e
+
+    listed = dict(zip(req.doc_ids, await asyncio.gather(*(list_chunks(doc_id) for doc_id in req.doc_ids))))
+    all_ids = [chunk_id for ids in listed.values() if isinstance(ids, list) for chunk_id in ids]
+    try:
+        vectors = await asyncio.to_thread(fetch_vectors, all_ids)
     except Exception as e:
-        return {"error": str(e)}
\ No newline at end of file
+        raise HTTPException(status_code=502, detail=f"Fetching chunks failed: {str(e)}")
+
+    def audit(doc_id: str) -> Dict:
+        chunk_ids = listed[doc_id]
+        if isinstance(chunk_ids, Exception):
+            return {"document_id": doc_id, "error": str(chunk_ids)}
+        report = audit_document(doc_id, chunk_ids, vectors)
+        if not req.include_chunks:
+            norms = [chunk["norm"] for chunk in report.pop("chunks")]
+            report["min_norm"] = min(norms, default=None)
+            report["max_norm"] = max(norms, default=None)
+        return report
+
+    reports = [audit(doc_id) for doc_id in req.doc_ids]
+    return {
+        "documents_checked": len(reports),
+        "documents_missing": sum(1 for r in reports if r.get("chunks_found") == 0),
+        "documents_with_issues": sum(1 for r in reports if r.get("issues") or r.get("error")),
+        "documents": reports,
+    }
+
+
+# -------------------------------
+# Admin introspection API
+# -------------------------------
+REMOTE_PROFILE_GRACE = 5  # extra seconds to wait for worker results
+
+def require_admin(x_admin_key: Optional[str] = Header(None)):
+    """Admin endpoints need X-Admin-Key == ADMIN_API_KEY and are off when it is unset."""
+    if not config.API_KEY_FOR_ADMIN:
+        raise HTTPException(status_code=403, detail="Admin endpoints disabled")
+    if not x_admin_key or not hmac.compare_digest(x_admin_key, config.API_KEY_FOR_ADMIN):
+        raise HTTPException(status_code=401, detail="Invalid admin key")
+
+async def run_tracemalloc(fn, *args):
+    """Run snapshot work on its own thread: not the default executor, not behind a profile."""
+    return await asyncio.get_running_loop().run_in_executor(profiling.snapshot_executor, fn, *args)
+
+@app.get("/admin/profile", dependencies=[Depends(require_admin)])
+async def admin_profile(seconds: float = 10, interval_ms: float = profiling.PROFILE_INTERVAL_MS,
+                        include_idle: bool = False, format: str = "json"):
+    """
+    Wall-clock sampling profile of this process. format=collapsed returns
+    flamegraph.pl / speedscope input instead of JSON.
+    """
+    try:
+        # Claims the profiler before queueing, so a concurrent request gets 409 instead of waiting
+        future = profiling.submit_profile(seconds, interval_ms, include_idle)
+    except profiling.ProfilerBusy as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    profile = await asyncio.wrap_future(future)
+    if format == "collapsed":
+        return PlainTextResponse(profiling.to_collapsed(profile))
+    return profile
+
+@app.post("/admin/profile/{target}", dependencies=[Depends(require_admin)])
+async def admin_profile_remote(target: str, seconds: float = 10, interval_ms: float = profiling.PROFILE_INTERVAL_MS,
+                               include_idle: bool = False):
+    """
+    Profile every running `target` process ("worker", "change_stream") via
+    Redis pub/sub and return one profile per process.
+    """
+    seconds = min(max(seconds, 0.1), profiling.PROFILE_MAX_SECONDS)
+    request_id = uuid.uuid4().hex
+    listeners = profiling.request_remote_profile(redis_client, target, request_id, seconds, interval_ms, include_idle)
+    if not listeners:
+        raise HTTPException(status_code=404, detail="No processes are listening for profile requests")
+    await asyncio.sleep(seconds)
+    deadline = time.monotonic() + REMOTE_PROFILE_GRACE
+    results = {}
+    while time.monotonic() < deadline:
+        results = profiling.collect_remote_profiles(redis_client, request_id)
+        if len(results) >= listeners:
+            break
+        await asyncio.sleep(0.5)
+    return {"target": target, "request_id": request_id, "profiles": results}
+
+@app.get("/admin/tracemalloc", dependencies=[Depends(require_admin)])
+async def admin_tracemalloc_status():
+    return profiling.tracing_status()
+
+@app.post("/admin/tracemalloc/start", dependencies=[Depends(require_admin)])
+async def admin_tracemalloc_start(frames: int = profiling.TRACEMALLOC_FRAMES):
+    """Start tracing allocations. Adds overhead to every allocation until stopped."""
+    return profiling.start_tracing(frames)
+
+@app.post("/admin/tracemalloc/stop", dependencies=[Depends(require_admin)])
+async def admin_tracemalloc_stop():
+    return profiling.stop_tracing()
+
+@app.post("/admin/tracemalloc/snapshot", dependencies=[Depends(require_admin)])
+async def admin_tracemalloc_snapshot(label: Optional[str] = None, limit: int = 25, group_by: str = "lineno"):
+    try:
+        return await run_tracemalloc(profiling.take_snapshot, label, limit, group_by)
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+@app.get("/admin/tracemalloc/diff", dependencies=[Depends(require_admin)])
+async def admin_tracemalloc_diff(old: str, new: str, limit: int = 25, group_by: str = "lineno"):
+    try:
+        return await run_tracemalloc(profiling.compare_snapshots, old, new, limit, group_by)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+@app.post("/admin/tenants/{tenant_id}/invalidate", dependencies=[Depends(require_admin)])
+async def admin_invalidate_tenant(tenant_id: str):
+    """Drop a tenant's cached config ("*" for all) in every search process."""
+    tenant_registry.publish_invalidation(tenant_id)
+    return {"status": "invalidated", "tenant_id": tenant_id}
+
+@app.get("/admin/memory", dependencies=[Depends(require_admin)])
+async def admin_memory():
+    """Process RSS and per-model parameter memory."""
+    return {
+        "process": profiling.process_memory(),
+        "models": {
+            "embedding": profiling.model_memory(embedding_client.model),
+            "reranker": profiling.model_memory(reranker),
+        },
+        "tracemalloc": profiling.tracing_status(),
+    }
+
+@app.get("/admin/threads", dependencies=[Depends(require_admin)])
+async def admin_threads():
+    """Threads, executor backlog, asyncio tasks, stage counters and Redis queue depths."""
+    loop = asyncio.get_running_loop()
+    pipe = redis_client.pipeline()
+    pipe.llen("contentstack_jobs")
+    pipe.llen(STALE_DOCS_KEY)
+    pipe.llen(PRETRANSLATE_QUEUE_KEY)
+    pipe.xlen(QUERY_LOG_STREAM)
+    jobs, stale_docs, pretranslations, query_log = pipe.execute()
+    return {
+        "threads": profiling.thread_stats(),
+        "default_executor": profiling.executor_stats(getattr(loop, "_default_executor", None)),
+        "asyncio_tasks": len(asyncio.all_tasks(loop)),
+        "stages": stage_tracker.snapshot(),
+        "queues": {"contentstack_jobs": jobs, "stale_docs": stale_docs,
+                   "pretranslations": pretranslations, "query_log": query_log},
+    }
@@ -0,0 +1,67 @@
+# benchmarks/bench_language_detection.py
+"""
+Latency and accuracy of language_detection.detect_language versus langdetect
+on short search-style queries. Run from python-service/:
+python benchmarks/bench_language_detection.py
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from language_detection import _detect_normalized, normalize_query
+
+try:
+    from langdetect import detect, DetectorFactory
+    DetectorFactory.seed = 0
+    LANGDETECT_AVAILABLE = True
+except ImportError:
+    LANGDETECT_AVAILABLE = False
+
+LABELED_QUERIES = [
+    ("traffic", "en"), ("cheap flowers", "en"), ("best jogging routes in the city", "en"),
+    ("how to start a hobby", "en"), ("happy", "en"), ("monsoon travel tips", "en"),
+    ("affordable places to eat near me", "en"), ("what is semantic search", "en"),
+    ("शहर में यातायात", "hi"), ("सस्ते फूल कहाँ मिलेंगे", "hi"), ("मुझे दौड़ना पसंद है", "hi"),
+    ("बच्चों के लिए खेल", "hi"), ("यह क्या है", "hi"),
+    ("शहरातील वाहतूक समस्या", "mr"), ("स्वस्त फुले कुठे मिळतील", "mr"), ("मला धावणे आवडते", "mr"),
+    ("मुलांसाठी खेळ", "mr"), ("हे काय आहे", "mr"),
+    ("सहरमा यातायात", "ne"), ("सस्तो फूल कहाँ पाइन्छ", "ne"), ("मलाई दौडनु मन पर्छ", "ne"),
+    ("बच्चाहरूका लागि खेल", "ne"), ("यो के हो", "ne"),
+    ("ನಗರದಲ್ಲಿ ಸಂಚಾರ ದಟ್ಟಣೆ", "kn"), ("நகர போக்குவரத்து", "ta"), ("నగరంలో ట్రాఫిక్", "te"),
+    ("શહેરમાં ટ્રાફિક", "gu"), ("শহরে যানজট", "bn"), ("ਸ਼ਹਿਰ ਵਿੱਚ ਟ੍ਰੈਫਿਕ", "pa"),
+    ("നഗരത്തിലെ ഗതാഗതം", "ml"), ("ସହରରେ ଟ୍ରାଫିକ୍", "or"), ("شہر میں ٹریفک", "ur"),
+    ("tráfico en la ciudad", "es"), ("flores baratas", "es"), ("circulation en ville", "fr"),
+    ("fleurs pas chères", "fr"), ("verkehr in der stadt", "de"), ("günstige blumen", "de"),
+]
+
+
+def evaluate(name, fn):
+    correct = 0
+    start = time.perf_counter()
+    for query, expected in LABELED_QUERIES:
+        try:
+            got = fn(query)
+        except Exception:
+            got = None
+        correct += got == expected
+    per_query_us = (time.perf_counter() - start) / len(LABELED_QUERIES) * 1e6
+    print(f"{name:<28}{per_query_us:>12.1f}{correct / len(LABELED_QUERIES):>10.1%}")
+
+
+def main():
+    # Build the n-gram models before timing, as a warm pod would have them
+    _detect_normalized(normalize_query("warm up"))
+    _detect_normalized(normalize_query("यह"))
+    _detect_normalized.cache_clear()
+
+    print(f"{len(LABELED_QUERIES)} labeled queries")
+    print(f"{'detector':<28}{'us/query':>12}{'accuracy':>10}")
+    evaluate("script + ngram (uncached)", lambda q: _detect_normalized(normalize_query(q)))
+    evaluate("script + ngram (cached)", lambda q: _detect_normalized(normalize_query(q)))
+    if LANGDETECT_AVAILABLE:
+        evaluate("langdetect", detect)
+
+
+if __name__ == "__main__":
+    main()
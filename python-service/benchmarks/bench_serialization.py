@@ -0,0 +1,74 @@
+# benchmarks/bench_serialization.py
+"""
+Bytes stored and CPU per operation for Redis payload codecs, on a search
+cache entry and a worker job. Run from python-service/:
+python benchmarks/bench_serialization.py
+"""
+import os
+import sys
+import json
+import time
+import random
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import serialization
+from serialization import Serializer
+
+WORDS = "traffic city flower garden budget hobby jogging fitness travel market recipe festival monsoon river".split()
+
+
+def text(rng, words):
+    return " ".join(rng.choices(WORDS, k=words))
+
+
+def sample_payloads():
+    rng = random.Random(0)
+    hits = [{
+        "id": f"blt{i:012d}",
+        "score": rng.random(),
+        "metadata": {
+            "doc_id": f"blt{i:012d}", "title": text(rng, 8), "chunk_type": "body", "chunk_index": 0,
+            "locale": "en-us", "content_type": "page", "text": text(rng, 200),
+        },
+        "chunk_matches": 3, "reranker_score": rng.random() * 10, "final_score": rng.random() * 10,
+    } for i in range(5)]
+    job = {
+        "event": "entry.update", "uid": "blt000000000001", "title": text(rng, 8), "body": text(rng, 2000),
+        "locale": "en-us", "content_type": "page", "enqueued_at": time.time(),
+    }
+    return {"search cache entry": {"results": hits}, "worker job": job}
+
+
+def bench(fn, arg, repeat):
+    start = time.process_time()
+    for _ in range(repeat):
+        fn(arg)
+    return (time.process_time() - start) / repeat * 1e6
+
+
+def main(repeat: int = 2000):
+    codecs = [("stdlib json (legacy)", None)]
+    codecs.append(("json" if not serialization.ORJSON_AVAILABLE else "orjson", Serializer("json", 0)))
+    if serialization.ZSTD_AVAILABLE:
+        codecs.append(("orjson + zstd" if serialization.ORJSON_AVAILABLE else "json + zstd", Serializer("json", 1)))
+    if serialization.MSGPACK_AVAILABLE:
+        codecs.append(("msgpack", Serializer("msgpack", 0)))
+        if serialization.ZSTD_AVAILABLE:
+            codecs.append(("msgpack + zstd", Serializer("msgpack", 1)))
+
+    for name, payload in sample_payloads().items():
+        print(f"\n{name}")
+        print(f"{'codec':<24}{'bytes':>10}{'dumps us':>12}{'loads us':>12}")
+        for codec_name, codec in codecs:
+            if codec is None:
+                dumps = lambda obj: json.dumps(obj).encode("utf-8")
+                loads = json.loads
+            else:
+                dumps, loads = codec.dumps, codec.loads
+            data = dumps(payload)
+            assert loads(data) == payload
+            print(f"{codec_name:<24}{len(data):>10}{bench(dumps, payload, repeat):>12.1f}{bench(loads, data, repeat):>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
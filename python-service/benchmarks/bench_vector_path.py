@@ -0,0 +1,122 @@
+# benchmarks/bench_vector_path.py
+"""
+Per-10k-vector cost of pinecone_client.upsert_vectors through the real
+Pinecone SDK request build (REST/JSON and gRPC/protobuf, network calls
+stubbed out) versus the in-memory store. Needs pinecone[grpc].
+Run from python-service/: python benchmarks/bench_vector_path.py
+"""
+import os
+import sys
+import time
+import argparse
+import tracemalloc
+
+import numpy as np
+import urllib3
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Import without connecting to Pinecone; the wire rows switch the backend back below
+os.environ["VECTOR_BACKEND"] = "local"
+import pinecone_client
+from local_index import LocalIndex
+
+from pinecone.db_data import Index
+from pinecone.grpc import PineconeGRPC
+from pinecone.core.grpc.protos.db_data_2025_04_pb2 import UpsertResponse
+
+
+class StubPool:
+    """urllib3 pool that records request body sizes instead of sending them."""
+
+    def __init__(self, sent):
+        self.sent = sent
+
+    def request(self, method, url, body=None, **kwargs):
+        self.sent.append(len(body or b""))
+        return urllib3.HTTPResponse(body=b'{"upsertedCount": 0}', status=200,
+                                    headers={"content-type": "application/json"}, preload_content=True)
+
+
+def rest_index(sent):
+    index = Index(api_key="bench", host="http://localhost:9")
+    index._vector_api.api_client.rest_client.pool_manager = StubPool(sent)
+    return index
+
+
+def grpc_index(sent):
+    index = PineconeGRPC(api_key="bench").Index(host="localhost:9")
+
+    def run(func, request, timeout=None, **kwargs):
+        sent.append(len(request.SerializeToString()))
+        return UpsertResponse(upserted_count=len(request.vectors))
+
+    index.runner.run = run
+    return index
+
+
+def measure(fn):
+    """Return (cpu_ms, peak_alloc_mb, bytes_sent); CPU is timed without tracemalloc overhead."""
+    cpu_start = time.process_time()
+    sent = fn()
+    cpu_ms = (time.process_time() - cpu_start) * 1000
+
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return cpu_ms, peak / 1e6, sum(sent)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--count", type=int, default=10000)
+    parser.add_argument("--dim", type=int, default=768)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    matrix = rng.standard_normal((args.count, args.dim), dtype=np.float32)
+    matrix /= np.linalg.norm(matrix, axis=1, keepdims=True)
+    ids = [f"doc{i}_body_0" for i in range(args.count)]
+    metadatas = [{"doc_id": f"doc{i}"} for i in range(args.count)]
+
+    def vectors():
+        # As built by document_index: float32 row views of one encode_texts matrix
+        return [{"id": i, "values": row, "metadata": m} for i, row, m in zip(ids, matrix, metadatas)]
+
+    def sdk_upsert(make_index, backend):
+        def run():
+            sent = []
+            pinecone_client.VECTOR_BACKEND = backend
+            try:
+                pinecone_client.upsert_vectors(vectors(), target_index=make_index(sent))
+            finally:
+                pinecone_client.VECTOR_BACKEND = "local"
+            return sent
+        return run
+
+    def local_lists():
+        LocalIndex().upsert([{"id": i, "values": row.tolist(), "metadata": m} for i, row, m in zip(ids, matrix, metadatas)])
+        return []
+
+    def local_arrays():
+        pinecone_client.upsert_arrays(ids, matrix, metadatas, target_index=LocalIndex())
+        return []
+
+    rows = [
+        ("REST, to_wire lists", sdk_upsert(rest_index, "pinecone")),
+        ("gRPC, to_wire lists", sdk_upsert(grpc_index, "pinecone")),
+        # Arrays handed to the SDK as-is: it calls tolist() per vector itself
+        ("gRPC, arrays to SDK", sdk_upsert(grpc_index, "local")),
+        ("local store, lists", local_lists),
+        ("local store, arrays", local_arrays),
+    ]
+    print(f"{args.count} vectors x {args.dim} dims, batches of {pinecone_client.UPSERT_BATCH_SIZE}")
+    print(f"{'path':<24}{'cpu ms':>10}{'peak MB':>10}{'sent MB':>10}")
+    for name, fn in rows:
+        cpu_ms, peak_mb, sent = measure(fn)
+        size = f"{sent / 1e6:.1f}" if sent else "-"
+        print(f"{name:<24}{cpu_ms:>10.1f}{peak_mb:>10.1f}{size:>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+# candidates.py
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+import numpy as np
+
+
+def doc_id_for(vector_id: str, metadata: Dict) -> str:
+    """
+    Document ID of a chunk: metadata doc_id when present, otherwise the
+    vector ID without its "_title" / "_body_<n>" chunk suffix.
+    """
+    doc_id = metadata.get("doc_id")
+    if doc_id:
+        return doc_id
+    if vector_id.endswith("_title"):
+        return vector_id[:-len("_title")]
+    if "_body_" in vector_id:
+        return vector_id.rsplit("_body_", 1)[0]
+    return vector_id
+
+
+@dataclass
+class DocumentSet:
+    """
+    Columnar document-level candidates, ordered by rank. reranker_scores is
+    set once a cross-encoder has scored the documents.
+    """
+    ids: np.ndarray
+    scores: np.ndarray
+    chunk_matches: np.ndarray
+    metadata: List[Dict]
+    reranker_scores: Optional[np.ndarray] = None
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @property
+    def final_scores(self) -> np.ndarray:
+        return self.reranker_scores if self.reranker_scores is not None else self.scores
+
+    def take(self, indices) -> "DocumentSet":
+        indices = np.asarray(indices, dtype=np.intp)
+        return DocumentSet(
+            ids=self.ids[indices],
+            scores=self.scores[indices],
+            chunk_matches=self.chunk_matches[indices],
+            metadata=[self.metadata[i] for i in indices],
+            reranker_scores=None if self.reranker_scores is None else self.reranker_scores[indices],
+        )
+
+    def top(self, k: int) -> "DocumentSet":
+        return self.take(np.arange(min(k, len(self))))
+
+    def texts(self) -> List[str]:
+        """Title + best chunk text per document, as fed to the reranker."""
+        return [f"{m.get('title', '')} {m.get('text', '')}".strip() for m in self.metadata]
+
+    def with_reranker_scores(self, reranker_scores) -> "DocumentSet":
+        """Attach reranker scores and reorder by them (stable on ties)."""
+        reranker_scores = np.asarray(reranker_scores, dtype=np.float64)
+        order = np.argsort(-reranker_scores, kind="stable")
+        ranked = self.take(order)
+        ranked.reranker_scores = reranker_scores[order]
+        return ranked
+
+    def to_results(self) -> List[Dict]:
+        results = []
+        for i in range(len(self)):
+            result = {
+                "id": str(self.ids[i]),
+                "score": float(self.scores[i]),
+                "metadata": self.metadata[i],
+                "chunk_matches": int(self.chunk_matches[i]),
+            }
+            if self.reranker_scores is not None:
+                result["reranker_score"] = float(self.reranker_scores[i])
+                result["final_score"] = result["reranker_score"]
+            results.append(result)
+        return results
+
+    @classmethod
+    def empty(cls) -> "DocumentSet":
+        return cls(
+            ids=np.empty(0, dtype=object),
+            scores=np.empty(0),
+            chunk_matches=np.empty(0, dtype=np.int64),
+            metadata=[],
+        )
+
+
+@dataclass
+class CandidateSet:
+    """Columnar chunk-level matches as returned by the vector store."""
+    ids: np.ndarray
+    doc_ids: np.ndarray
+    scores: np.ndarray
+    chunk_types: np.ndarray
+    metadata: List[Dict]
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @classmethod
+    def from_matches(cls, matches: List[Dict]) -> "CandidateSet":
+        metadata = [match.get("metadata") or {} for match in matches]
+        return cls(
+            ids=np.array([match["id"] for match in matches], dtype=object),
+            doc_ids=np.array([doc_id_for(match["id"], m) for match, m in zip(matches, metadata)], dtype=object),
+            scores=np.array([match["score"] for match in matches], dtype=np.float64),
+            chunk_types=np.array([m.get("chunk_type", "document") for m in metadata], dtype=object),
+            metadata=metadata,
+        )
+
+    def aggregate(self, mode: str = "max", title_boost: float = 1.0) -> DocumentSet:
+        """
+        Group chunks by document with NumPy grouped reductions.
+
+        mode="max" scores a document by its best chunk; mode="sum" adds up
+        chunk scores, weighting title chunks by title_boost. In both modes the
+        document's metadata comes from its highest-scoring chunk.
+        """
+        if not len(self):
+            return DocumentSet.empty()
+
+        doc_keys, inverse = np.unique(self.doc_ids, return_inverse=True)
+        num_docs = len(doc_keys)
+
+        if mode == "sum":
+            weights = np.where(self.chunk_types == "title", title_boost, 1.0)
+            doc_scores = np.bincount(inverse, weights=self.scores * weights, minlength=num_docs)
+        else:
+            doc_scores = np.full(num_docs, -np.inf)
+            np.maximum.at(doc_scores, inverse, self.scores)
+
+        # Best chunk per document: sort by (document, -score), keep each group's first row
+        order = np.lexsort((-self.scores, inverse))
+        group_starts = np.r_[0, np.flatnonzero(np.diff(inverse[order])) + 1]
+        best_chunk = np.empty(num_docs, dtype=np.intp)
+        best_chunk[inverse[order[group_starts]]] = order[group_starts]
+
+        ranked = np.argsort(-doc_scores, kind="stable")
+        return DocumentSet(
+            ids=doc_keys[ranked],
+            scores=doc_scores[ranked],
+            chunk_matches=np.bincount(inverse, minlength=num_docs)[ranked],
+            metadata=[self.metadata[i] for i in best_chunk[ranked]],
+        )
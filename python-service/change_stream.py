@@ -0,0 +1,217 @@
+# change_stream.py
+"""
+Incremental indexing from a MongoDB change stream on DOCUMENT_COLLECTION.
+
+Changes are collapsed per document and applied in batches through the same
+chunk/embed/upsert path as the webhook. The uid indexed for each Mongo _id
+is kept in UID_MAP_COLLECTION so deletes remove the right vectors. The resume token is stored in
+RESUME_TOKEN_COLLECTION after each applied batch, so a restart continues
+after the last indexed change (changes may be re-applied, never skipped).
+Change streams need a replica set; a single-node one works locally:
+    mongod --replSet rs0  &&  mongosh --eval "rs.initiate()"
+"""
+import os
+import time
+import logging
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+from dotenv import load_dotenv
+from pymongo import MongoClient, UpdateOne, DeleteOne
+from pymongo.errors import OperationFailure
+
+from redis_connection import get_redis
+from documents import INDEXED_FIELDS, document_fields, known_uid_keys, plan_changes
+from document_index import index_documents, delete_documents
+from translation import pretranslate_documents, delete_pretranslations
+from query_log import mark_document_updated
+from profiling import start_profile_listener
+
+load_dotenv()
+logging.basicConfig(level=logging.INFO)
+
+# -------------------------------
+# Configuration
+# -------------------------------
+MONGO_URI = os.getenv("MONGO_URI", "mongodb://localhost:27017")
+DB_NAME = os.getenv("DB_NAME", "techsurf")
+DOCUMENT_COLLECTION = os.getenv("DOCUMENT_COLLECTION", "documents")
+RESUME_TOKEN_COLLECTION = os.getenv("RESUME_TOKEN_COLLECTION", "ingest_state")
+CHANGE_STREAM_NAME = os.getenv("CHANGE_STREAM_NAME", "documents")  # resume token document _id
+CHANGE_STREAM_BATCH_SIZE = int(os.getenv("CHANGE_STREAM_BATCH_SIZE", 64))  # documents per encode call
+CHANGE_STREAM_MAX_WAIT = float(os.getenv("CHANGE_STREAM_MAX_WAIT", 2))  # seconds a partial batch may wait
+CHANGE_STREAM_RETRY_DELAY = float(os.getenv("CHANGE_STREAM_RETRY_DELAY", 5))
+UID_MAP_COLLECTION = os.getenv("UID_MAP_COLLECTION", "ingest_uids")  # Mongo _id -> indexed uid
+# Optional pre-images (MongoDB 6.0+, changeStreamPreAndPostImages on the
+# collection) give deletes the document's uid without the uid map.
+CHANGE_STREAM_PRE_IMAGES = os.getenv("CHANGE_STREAM_PRE_IMAGES", "false").lower() == "true"
+
+CHANGE_STREAM_HISTORY_LOST = 286  # resume point already rolled off the oplog
+
+# -------------------------------
+# Service Connections
+# -------------------------------
+redis_client = get_redis()
+mongo_client = MongoClient(MONGO_URI)
+db = mongo_client[DB_NAME]
+documents_collection = db[DOCUMENT_COLLECTION]
+state_collection = db[RESUME_TOKEN_COLLECTION]
+uid_map_collection = db[UID_MAP_COLLECTION]
+
+
+# -------------------------------
+# Resume tokens
+# -------------------------------
+def load_resume_token() -> Optional[Dict]:
+    state = state_collection.find_one({"_id": CHANGE_STREAM_NAME})
+    return state.get("resume_token") if state else None
+
+
+def save_resume_token(token: Optional[Dict], applied: int = 0):
+    state_collection.update_one(
+        {"_id": CHANGE_STREAM_NAME},
+        {
+            "$set": {"resume_token": token, "updated_at": datetime.now(timezone.utc)},
+            "$inc": {"changes_applied": applied},
+        },
+        upsert=True,
+    )
+
+
+# -------------------------------
+# Indexed uids
+# -------------------------------
+# Delete events carry only the Mongo _id while vectors are keyed by the
+# document uid, so the uid indexed for each _id is kept in UID_MAP_COLLECTION.
+def load_known_uids(doc_ids: List) -> Dict[str, str]:
+    if not doc_ids:
+        return {}
+    return {str(m["_id"]): m["uid"] for m in uid_map_collection.find({"_id": {"$in": doc_ids}})}
+
+
+def seed_uid_map():
+    """Record uids of documents indexed before the tailer ran (once per stream)."""
+    state = state_collection.find_one({"_id": CHANGE_STREAM_NAME}) or {}
+    if state.get("uid_map_seeded"):
+        return
+    batch = []
+    seeded = 0
+    for doc in documents_collection.find({}, {field: 1 for field in INDEXED_FIELDS}):
+        batch.append(UpdateOne({"_id": doc["_id"]}, {"$set": {"uid": document_fields(doc)["uid"]}}, upsert=True))
+        if len(batch) >= 1000:
+            seeded += uid_map_collection.bulk_write(batch, ordered=False).upserted_count
+            batch = []
+    if batch:
+        seeded += uid_map_collection.bulk_write(batch, ordered=False).upserted_count
+    state_collection.update_one({"_id": CHANGE_STREAM_NAME}, {"$set": {"uid_map_seeded": True}}, upsert=True)
+    logging.info(f"🗂️ Seeded uid map with {seeded} documents")
+
+
+def update_uid_map(plan: Dict[str, List]):
+    indexed = plan["new"] + plan["updated"]
+    still_present = {str(doc_id) for doc_id, _ in indexed}
+    operations = [UpdateOne({"_id": doc_id}, {"$set": {"uid": doc["uid"]}}, upsert=True) for doc_id, doc in indexed]
+    operations += [DeleteOne({"_id": doc_id}) for doc_id, _ in plan["deleted"] if str(doc_id) not in still_present]
+    if operations:
+        uid_map_collection.bulk_write(operations, ordered=False)
+
+
+# -------------------------------
+# Applying changes
+# -------------------------------
+def apply_changes(changes: List[Dict]) -> int:
+    """Index upserted documents and drop deleted ones. Returns the number applied."""
+    plan = plan_changes(changes, load_known_uids(known_uid_keys(changes)))
+    new_docs = [doc for _, doc in plan["new"]]
+    upserts = [doc for _, doc in plan["updated"]]
+    deletes = [uid for _, uid in plan["deleted"]]
+    for doc_id in plan["unresolved"]:
+        logging.warning(f"⚠️ Deleted document {doc_id} has no known uid, its vectors (if any) are kept")
+
+    chunks = index_documents(new_docs, replace_existing=False) + index_documents(upserts)
+    removed = delete_documents(deletes)
+    update_uid_map(plan)
+    pretranslate_documents(redis_client, [(d["uid"], d["title"], d["body"]) for d in new_docs + upserts])
+    for uid in deletes:
+        delete_pretranslations(redis_client, uid)
+    for uid in [d["uid"] for d in new_docs + upserts] + deletes:
+        mark_document_updated(redis_client, uid)
+
+    logging.info(f"✅ Applied {len(new_docs) + len(upserts)} upserts ({chunks} chunks) "
+                 f"and {len(deletes)} deletes ({removed} chunks)")
+    return len(new_docs) + len(upserts) + len(deletes)
+
+
+# -------------------------------
+# Tailing
+# -------------------------------
+def open_stream(resume_token: Optional[Dict]):
+    # start_after (unlike resume_after) can also resume past an invalidate event
+    options = {"full_document": "updateLookup", "start_after": resume_token,
+               "max_await_time_ms": int(CHANGE_STREAM_MAX_WAIT * 1000)}
+    if CHANGE_STREAM_PRE_IMAGES:
+        options["full_document_before_change"] = "whenAvailable"
+    return documents_collection.watch(**options)
+
+
+def tail(stream, resume_token: Optional[Dict]):
+    """
+    Apply changes in batches until the stream closes (e.g. collection
+    dropped). A batch is applied when it is full, when the stream goes
+    idle, or after CHANGE_STREAM_MAX_WAIT seconds; the token is saved
+    only after its batch has been applied.
+    """
+    if resume_token is None:
+        # Fresh start: pin "now" so a failure in the first batch does not skip it
+        resume_token = stream.resume_token
+        save_resume_token(resume_token)
+
+    batch = []
+    deadline = None
+    while stream.alive:
+        change = stream.try_next()
+        if change is not None:
+            batch.append(change)
+            deadline = deadline or time.monotonic() + CHANGE_STREAM_MAX_WAIT
+            if change["operationType"] == "invalidate":
+                logging.warning(f"⚠️ Change stream invalidated for {DOCUMENT_COLLECTION}")
+
+        if batch and (change is None or len(batch) >= CHANGE_STREAM_BATCH_SIZE or time.monotonic() >= deadline):
+            applied = apply_changes(batch)
+            batch, deadline = [], None
+            resume_token = stream.resume_token
+            save_resume_token(resume_token, applied)
+        elif not batch and stream.resume_token != resume_token:
+            # Idle streams advance their token too; saving it keeps restarts inside the oplog window
+            resume_token = stream.resume_token
+            save_resume_token(resume_token)
+
+    if batch:
+        save_resume_token(stream.resume_token, apply_changes(batch))
+
+
+def run():
+    logging.info(f"🚀 Tailing {DB_NAME}.{DOCUMENT_COLLECTION}")
+    seed_uid_map()
+    while True:
+        # Always reopen from the last saved token: unsaved batches are replayed
+        resume_token = load_resume_token()
+        try:
+            with open_stream(resume_token) as stream:
+                tail(stream, resume_token)
+        except OperationFailure as e:
+            if e.code != CHANGE_STREAM_HISTORY_LOST:
+                logging.error(f"❌ Change stream failed: {str(e)}")
+                time.sleep(CHANGE_STREAM_RETRY_DELAY)
+                continue
+            # Changes since the saved token are gone: start from now, a full reindex fills the gap
+            logging.error("❌ Resume token is no longer in the oplog; run /reindex/all to recover missed changes")
+            save_resume_token(None)
+        except Exception as e:
+            logging.error(f"❌ Change stream error: {str(e)}")
+            time.sleep(CHANGE_STREAM_RETRY_DELAY)
+
+
+if __name__ == "__main__":
+    start_profile_listener(redis_client, "change_stream")
+    run()
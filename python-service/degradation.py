@@ -0,0 +1,146 @@
+# degradation.py
+import os
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# -------------------------------
+# Configuration
+# -------------------------------
+SEARCH_LATENCY_BUDGET_MS = int(os.getenv("SEARCH_LATENCY_BUDGET_MS", 2000))
+MAX_CONCURRENT_SEARCHES = int(os.getenv("MAX_CONCURRENT_SEARCHES", 64))  # hard cap, above this we shed with 503
+RERANK_MAX_IN_FLIGHT = int(os.getenv("RERANK_MAX_IN_FLIGHT", 4))
+TRANSLATE_MAX_IN_FLIGHT = int(os.getenv("TRANSLATE_MAX_IN_FLIGHT", 16))
+# Initial cost estimates, refined online from observed stage timings
+RERANK_MS_PER_CANDIDATE = float(os.getenv("RERANK_MS_PER_CANDIDATE", 5))
+TRANSLATE_MS_PER_HIT = float(os.getenv("TRANSLATE_MS_PER_HIT", 1500))
+EWMA_ALPHA = 0.2
+# Share of the remaining budget that reranking may give up to keep room for translation
+TRANSLATE_MAX_RESERVE = float(os.getenv("TRANSLATE_MAX_RESERVE", 0.5))
+
+
+class StageTracker:
+    """
+    Process-wide in-flight counters and latency estimates per pipeline stage.
+    Counters are guarded by a lock because stages also run in worker threads.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.in_flight: Dict[str, int] = {"search": 0, "rerank": 0, "translate": 0}
+        self.default_cost_ms: Dict[str, float] = {
+            "rerank": RERANK_MS_PER_CANDIDATE,
+            "translate": TRANSLATE_MS_PER_HIT,
+        }
+        self.cost_ms: Dict[str, float] = dict(self.default_cost_ms)
+        self.shed_count = 0
+
+    def try_admit(self, units: int = 1) -> bool:
+        """
+        Admit a new search (or `units` concurrent searches, for batches)
+        unless that would exceed the hard concurrency cap. An idle process
+        always admits, so a batch wider than the cap is not starved.
+        """
+        with self._lock:
+            in_flight = self.in_flight["search"]
+            if in_flight and in_flight + units > MAX_CONCURRENT_SEARCHES:
+                self.shed_count += 1
+                return False
+            self.in_flight["search"] += units
+            return True
+
+    def release(self, units: int = 1):
+        with self._lock:
+            self.in_flight["search"] -= units
+
+    @contextmanager
+    def track(self, stage: str, units: int = 1):
+        """Count a stage as in flight and fold its per-unit latency into the estimate."""
+        with self._lock:
+            self.in_flight[stage] += 1
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            elapsed_ms = (time.monotonic() - start) * 1000
+            with self._lock:
+                self.in_flight[stage] -= 1
+                per_unit = elapsed_ms / max(units, 1)
+                self.cost_ms[stage] = (1 - EWMA_ALPHA) * self.cost_ms[stage] + EWMA_ALPHA * per_unit
+
+    def skipped(self, stage: str):
+        """
+        Decay a skipped stage's estimate toward its default. Estimates only
+        learn from stages that run, so without this one slow spell would
+        keep the stage skipped for good.
+        """
+        with self._lock:
+            self.cost_ms[stage] = (1 - EWMA_ALPHA) * self.cost_ms[stage] + EWMA_ALPHA * self.default_cost_ms[stage]
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            return {
+                "in_flight": dict(self.in_flight),
+                "cost_ms": dict(self.cost_ms),
+                "shed_count": self.shed_count,
+            }
+
+
+stage_tracker = StageTracker()
+
+
+class SearchBudget:
+    """
+    Latency budget for a single search request. Decides how much of the
+    expensive stages (reranking, translation) can still be afforded and
+    records every degradation it applies.
+    """
+
+    def __init__(self, budget_ms: Optional[int] = None, tracker: StageTracker = stage_tracker):
+        self.budget_ms = budget_ms or SEARCH_LATENCY_BUDGET_MS
+        self.deadline = time.monotonic() + self.budget_ms / 1000
+        self.tracker = tracker
+        self.degraded: List[str] = []
+
+    def remaining_ms(self) -> float:
+        return max(0.0, (self.deadline - time.monotonic()) * 1000)
+
+    def rerank_depth(self, num_candidates: int, top_k: int, translate: bool) -> int:
+        """
+        Number of candidates to rerank: num_candidates when affordable, fewer
+        when the budget is tight, 0 when reranking should be skipped.
+        """
+        snapshot = self.tracker.snapshot()
+        if snapshot["in_flight"]["rerank"] >= RERANK_MAX_IN_FLIGHT:
+            self.degraded.append("rerank_skipped:queue")
+            return 0
+
+        remaining = self.remaining_ms()
+        if translate:
+            # Keep room for one round of (concurrent) translations, capped so reranking still gets a share
+            remaining -= min(snapshot["cost_ms"]["translate"], remaining * TRANSLATE_MAX_RESERVE)
+        affordable = int(remaining / max(snapshot["cost_ms"]["rerank"], 0.01))
+
+        if affordable < min(top_k, num_candidates) or affordable <= 1:
+            self.degraded.append("rerank_skipped:budget")
+            self.tracker.skipped("rerank")
+            return 0
+        if affordable < num_candidates:
+            self.degraded.append(f"rerank_depth:{affordable}")
+            return affordable
+        return num_candidates
+
+    def allow_translation(self) -> bool:
+        snapshot = self.tracker.snapshot()
+        if snapshot["in_flight"]["translate"] >= TRANSLATE_MAX_IN_FLIGHT:
+            self.degraded.append("translation_skipped:queue")
+            return False
+        if self.remaining_ms() < snapshot["cost_ms"]["translate"]:
+            self.degraded.append("translation_skipped:budget")
+            self.tracker.skipped("translate")
+            return False
+        return True
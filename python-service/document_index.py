@@ -0,0 +1,127 @@
+# document_index.py
+"""
+Chunked document embeddings shared by every ingestion source (webhook,
+change stream, /reindex/all): one "<uid>_title" chunk plus "<uid>_body_<n>"
+chunks of CHUNK_SIZE words.
+"""
+import os
+import re
+import logging
+from typing import Dict, Generator, Iterable, List, Tuple
+
+from embedding_client import encode_texts
+from pinecone_client import upsert_arrays, list_vector_ids, delete_vectors
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = int(os.getenv("CHUNK_SIZE", 200))  # Words per chunk
+
+
+def chunk_text(text: str, chunk_size: int = 200) -> Generator[str, None, None]:
+    """
+    Split text into chunks of approximately chunk_size words.
+    """
+    if not text:
+        return
+
+    words = text.split()
+    for i in range(0, len(words), chunk_size):
+        yield " ".join(words[i:i + chunk_size])
+
+
+def document_chunks(uid: str, title: str, body: str, locale: str, content_type: str) -> Tuple[List[str], List[str], List[Dict]]:
+    """Vector IDs, chunk texts and metadata for one document."""
+    ids = []
+    texts = []
+    metadatas = []
+
+    # Title as separate chunk
+    if title:
+        ids.append(f"{uid}_title")
+        texts.append(title)
+        metadatas.append({
+            "doc_id": uid,
+            "title": title,
+            "chunk_type": "title",
+            "locale": locale,
+            "content_type": content_type,
+            "text": title
+        })
+
+    # Body in chunks
+    if body:
+        for chunk_idx, chunk in enumerate(chunk_text(body, CHUNK_SIZE)):
+            ids.append(f"{uid}_body_{chunk_idx}")
+            texts.append(chunk)
+            metadatas.append({
+                "doc_id": uid,
+                "title": title,
+                "chunk_type": "body",
+                "chunk_index": chunk_idx,
+                "locale": locale,
+                "content_type": content_type,
+                "text": chunk
+            })
+
+    return ids, texts, metadatas
+
+
+def _is_chunk_of(vector_id: str, uid: str) -> bool:
+    # "<uid>_" prefixes also match other documents whose uid starts with "<uid>_"
+    suffix = vector_id[len(uid) + 1:]
+    return suffix == "title" or re.fullmatch(r"body_\d+", suffix) is not None
+
+
+def document_chunk_ids(uid: str, namespace: str = None, target_index=None) -> List[str]:
+    """IDs currently stored for a document (needs an index that supports list)."""
+    return [
+        vector_id
+        for vector_id in list_vector_ids(f"{uid}_", namespace=namespace, target_index=target_index)
+        if _is_chunk_of(vector_id, uid)
+    ]
+
+
+def index_documents(documents: Iterable[Dict], replace_existing: bool = True) -> int:
+    """
+    Embed and upsert several documents with a single encode call. With
+    replace_existing, chunks left over from a longer previous version are
+    deleted; new documents can skip that list round trip.
+    Returns the number of chunks upserted.
+    """
+    ids, texts, metadatas = [], [], []
+    uids = []
+    for doc in documents:
+        doc_ids, doc_texts, doc_metadatas = document_chunks(
+            doc["uid"], doc["title"], doc["body"], doc["locale"], doc["content_type"]
+        )
+        if doc_ids:
+            uids.append(doc["uid"])
+            ids.extend(doc_ids)
+            texts.extend(doc_texts)
+            metadatas.extend(doc_metadatas)
+
+    if not texts:
+        return 0
+
+    stale = []
+    if replace_existing:
+        current = set(ids)
+        for uid in uids:
+            try:
+                stale.extend(vector_id for vector_id in document_chunk_ids(uid) if vector_id not in current)
+            except Exception as e:
+                logger.warning(f"Could not list chunks of {uid}, leftovers are kept: {str(e)}")
+
+    upsert_arrays(ids, encode_texts(texts, normalize=True), metadatas)
+    delete_vectors(stale)
+    logger.info(f"Indexed {len(uids)} documents ({len(ids)} chunks, {len(stale)} stale chunks removed)")
+    return len(ids)
+
+
+def delete_documents(uids: Iterable[str]) -> int:
+    """Delete every chunk of the given documents. Returns the number of chunks removed."""
+    ids = []
+    for uid in uids:
+        ids.extend(document_chunk_ids(uid))
+    delete_vectors(ids)
+    return len(ids)
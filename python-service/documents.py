@@ -0,0 +1,94 @@
+# documents.py
+"""
+Shape of documents in DOCUMENT_COLLECTION and how MongoDB change events
+map onto index operations. No service connections, so the planning logic
+can be used (and tested) without models or databases.
+"""
+from typing import Dict, List
+
+# Document fields that end up in vectors; changes to other fields need no re-embedding
+INDEXED_FIELDS = ("uid", "title", "body", "locale", "content_type")
+UPSERT_OPERATIONS = ("insert", "update", "replace")
+
+
+def document_fields(doc: Dict) -> Dict:
+    """Normalize a stored document to the fields used for indexing."""
+    return {
+        "uid": doc.get("uid") or str(doc.get("_id", "")),
+        "title": doc.get("title", "") or "",
+        "body": doc.get("body", "") or "",
+        "locale": doc.get("locale", "en-us"),
+        "content_type": doc.get("content_type", "unknown"),
+    }
+
+
+def touches_indexed_fields(change: Dict) -> bool:
+    """False for updates that only modify fields which never reach the vectors."""
+    if change["operationType"] != "update":
+        return True
+    description = change.get("updateDescription") or {}
+    changed = list(description.get("updatedFields") or {}) + list(description.get("removedFields") or [])
+    return any(path.split(".", 1)[0] in INDEXED_FIELDS for path in changed)
+
+
+def change_key(change: Dict) -> str:
+    return str(change["documentKey"]["_id"])
+
+
+def collapse_changes(changes: List[Dict]) -> Dict[str, Dict]:
+    """Last relevant change per document key, in stream order."""
+    latest = {}
+    for change in changes:
+        if change["operationType"] not in UPSERT_OPERATIONS + ("delete",):
+            continue
+        if not touches_indexed_fields(change):
+            continue
+        key = change_key(change)
+        latest.pop(key, None)
+        latest[key] = change
+    return latest
+
+
+def plan_changes(changes: List[Dict], known_uids: Dict[str, str]) -> Dict[str, List]:
+    """
+    Turn a batch of change events into index operations.
+
+    known_uids maps str(_id) to the uid last indexed for that document.
+    Deletes carry no document, so their uid comes from the pre-image when
+    the stream has one, otherwise from known_uids; deletes that resolve to
+    neither are returned as "unresolved" instead of guessing. An update
+    that changes a document's uid also deletes the old uid's vectors.
+
+    Returns {"new": [(_id, doc)], "updated": [(_id, doc)],
+    "deleted": [(_id, uid)], "unresolved": [_id]} with raw document _ids.
+    """
+    plan = {"new": [], "updated": [], "deleted": [], "unresolved": []}
+    for key, change in collapse_changes(changes).items():
+        doc_id = change["documentKey"]["_id"]
+        previous_uid = known_uids.get(key)
+
+        if change["operationType"] == "delete":
+            before = change.get("fullDocumentBeforeChange")
+            uid = document_fields(before)["uid"] if before else previous_uid
+            if uid:
+                plan["deleted"].append((doc_id, uid))
+            else:
+                plan["unresolved"].append(doc_id)
+            continue
+
+        full_document = change.get("fullDocument")
+        if full_document is None:
+            # Deleted before the lookup ran; its delete event follows
+            continue
+        doc = document_fields(full_document)
+        if not doc["uid"] or not (doc["title"] or doc["body"]):
+            continue
+        if previous_uid and previous_uid != doc["uid"]:
+            plan["deleted"].append((doc_id, previous_uid))
+        plan["new" if change["operationType"] == "insert" else "updated"].append((doc_id, doc))
+    return plan
+
+
+def known_uid_keys(changes: List[Dict]) -> List:
+    """Raw _ids whose last indexed uid plan_changes may need."""
+    return [change["documentKey"]["_id"] for change in collapse_changes(changes).values()]
@@ -1,9 +1,14 @@
 # embedding_client.py
+import numpy as np
 from sentence_transformers import SentenceTransformer
 
 # Load model once
 model = SentenceTransformer("sentence-transformers/all-mpnet-base-v2")
 
-def encode_texts(texts):
-    """Return embeddings for a list of texts"""
-    return model.encode(texts)
+def encode_texts(texts, normalize: bool = False) -> np.ndarray:
+    """
+    Return embeddings for a list of texts as one C-contiguous float32 matrix
+    (one row per text), optionally unit-normalized.
+    """
+    embeddings = model.encode(texts, convert_to_numpy=True, normalize_embeddings=normalize)
+    return np.ascontiguousarray(embeddings, dtype=np.float32)
@@ -2,7 +2,7 @@
 
 from contentstack_client import fetch_entries, LOCALES
 from embedding_client import encode_texts
-from pinecone_client import upsert_vectors
+from pinecone_client import upsert_arrays
 
 BATCH_SIZE = 50
 CONTENT_TYPE_UID = "page"
@@ -29,7 +29,7 @@ for locale in LOCALES:
         if not entries:
             break
 
-        vectors = []
+        ids, texts, metadatas = [], [], []
         for idx, entry in enumerate(entries):
             title = entry.get("title", "")
             body = extract_text_from_richtext(entry.get("body", ""))
@@ -37,20 +37,18 @@ for locale in LOCALES:
             if not text:
                 continue
 
-            embedding = encode_texts([text])[0]
-            vectors.append({
-                "id": f"{locale}_{skip}_{idx}",  # unique per locale & batch
-                "values": embedding.tolist(),
-                "metadata": {
-                    "title": title,
-                    "body": body,
-                    "locale": locale
-                }
+            ids.append(f"{locale}_{skip}_{idx}")  # unique per locale & batch
+            texts.append(text)
+            metadatas.append({
+                "title": title,
+                "body": body,
+                "locale": locale
             })
 
-        if vectors:
-            upsert_vectors(vectors)
-            print(f"Inserted {len(vectors)} vectors for locale '{locale}' (skip={skip})")
+        if texts:
+            # One batched encode; the float32 matrix goes to the store without per-vector lists
+            upsert_arrays(ids, encode_texts(texts), metadatas)
+            print(f"Inserted {len(ids)} vectors for locale '{locale}' (skip={skip})")
 
         skip += BATCH_SIZE
 
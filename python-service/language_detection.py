@@ -0,0 +1,223 @@
+# language_detection.py
+import os
+import re
+import math
+import unicodedata
+from collections import Counter
+from functools import lru_cache
+from typing import Dict, Optional, Tuple
+
+LANGID_CACHE_SIZE = int(os.getenv("LANGID_CACHE_SIZE", 10000))
+DEFAULT_LANGUAGE = "en"
+SCRIPT_DOMINANCE = 0.6  # share of letters a script needs to decide the language
+
+# -------------------------------
+# Unicode script ranges
+# -------------------------------
+# Scripts used by exactly one of our target languages resolve immediately;
+# "deva" and "latn" are shared and go to the n-gram model.
+SCRIPT_RANGES = [
+    (0x0900, 0x097F, "deva"),
+    (0x0980, 0x09FF, "bn"),
+    (0x0A00, 0x0A7F, "pa"),
+    (0x0A80, 0x0AFF, "gu"),
+    (0x0B00, 0x0B7F, "or"),
+    (0x0B80, 0x0BFF, "ta"),
+    (0x0C00, 0x0C7F, "te"),
+    (0x0C80, 0x0CFF, "kn"),
+    (0x0D00, 0x0D7F, "ml"),
+    (0x0600, 0x06FF, "ur"),
+    (0x0750, 0x077F, "ur"),
+    (0xFB50, 0xFDFF, "ur"),
+    (0xFE70, 0xFEFF, "ur"),
+    (0x0370, 0x03FF, "el"),
+    (0x0400, 0x04FF, "ru"),
+    (0x0590, 0x05FF, "he"),
+    (0x0E00, 0x0E7F, "th"),
+    (0x3040, 0x30FF, "ja"),
+    (0xAC00, 0xD7AF, "ko"),
+    (0x4E00, 0x9FFF, "zh-cn"),
+]
+
+# -------------------------------
+# N-gram model seed text
+# -------------------------------
+# Small, frequent-word-heavy samples per language; trigram profiles are
+# built from them once, on first use.
+SEED_TEXT = {
+    "deva": {
+        "hi": (
+            "यह एक अच्छा दिन है और हम सब खुश हैं। मैं आज बाज़ार जा रहा हूँ। क्या आप मेरे साथ चलेंगे? "
+            "भारत में बहुत सारी भाषाएँ बोली जाती हैं। उसने कहा कि वह कल आएगा। हमें पानी की ज़रूरत है। "
+            "यह किताब बहुत अच्छी है। शहर में यातायात की समस्या है। मुझे फूल पसंद हैं। "
+            "बच्चों के लिए स्कूल में खेल का मैदान है। सस्ता खाना कहाँ मिलेगा? मेरा शौक पढ़ना है। "
+            "सुबह दौड़ना सेहत के लिए अच्छा होता है। इसके बारे में और जानकारी दीजिए।"
+        ),
+        "mr": (
+            "हा एक चांगला दिवस आहे आणि आम्ही सर्व आनंदी आहोत. मी आज बाजारात जात आहे. तुम्ही माझ्याबरोबर याल का? "
+            "भारतात अनेक भाषा बोलल्या जातात. तो म्हणाला की तो उद्या येईल. आम्हाला पाण्याची गरज आहे. "
+            "हे पुस्तक खूप छान आहे. शहरातील वाहतुकीची समस्या आहे. मला फुले आवडतात. "
+            "मुलांसाठी शाळेत खेळाचे मैदान आहे. स्वस्त जेवण कुठे मिळेल? माझा छंद वाचन आहे. "
+            "सकाळी धावणे आरोग्यासाठी चांगले असते. याबद्दल अधिक माहिती द्या."
+        ),
+        "ne": (
+            "यो एउटा राम्रो दिन हो र हामी सबै खुसी छौं। म आज बजार जाँदैछु। के तपाईं मसँग आउनुहुन्छ? "
+            "नेपालमा धेरै भाषाहरू बोलिन्छन्। उसले भन्यो कि ऊ भोलि आउँछ। हामीलाई पानीको आवश्यकता छ। "
+            "यो किताब धेरै राम्रो छ। सहरमा यातायातको समस्या छ। मलाई फूलहरू मन पर्छ। "
+            "बच्चाहरूका लागि विद्यालयमा खेल मैदान छ। सस्तो खाना कहाँ पाइन्छ? मेरो सोख पढ्नु हो। "
+            "बिहान दौडनु स्वास्थ्यका लागि राम्रो हुन्छ। यसको बारेमा थप जानकारी दिनुहोस्।"
+        ),
+    },
+    "latn": {
+        "en": (
+            "the quick brown fox jumps over the lazy dog. this is a good day and we are all happy. "
+            "i am going to the market today. will you come with me? there are many languages in india. "
+            "he said that he will come tomorrow. we need water. this book is very good. "
+            "traffic congestion in the city is a problem. i like flowers and gardening. "
+            "where can i find cheap food? my hobby is reading. running in the morning is good for health. "
+            "how to learn about the best places with things which should be done"
+        ),
+        "es": (
+            "el rápido zorro marrón salta sobre el perro perezoso. este es un buen día y todos estamos felices. "
+            "hoy voy al mercado. ¿vienes conmigo? en la india se hablan muchas lenguas. "
+            "él dijo que vendrá mañana. necesitamos agua. este libro es muy bueno. "
+            "el tráfico en la ciudad es un problema. me gustan las flores y la jardinería. "
+            "¿dónde puedo encontrar comida barata? mi afición es leer. correr por la mañana es bueno para la salud."
+        ),
+        "fr": (
+            "le renard brun rapide saute par-dessus le chien paresseux. c'est une belle journée et nous sommes tous heureux. "
+            "je vais au marché aujourd'hui. viens-tu avec moi? on parle beaucoup de langues en inde. "
+            "il a dit qu'il viendra demain. nous avons besoin d'eau. ce livre est très bon. "
+            "la circulation dans la ville est un problème. j'aime les fleurs et le jardinage. "
+            "où puis-je trouver de la nourriture pas chère? mon passe-temps est la lecture. courir le matin est bon pour la santé."
+        ),
+        "de": (
+            "der schnelle braune fuchs springt über den faulen hund. das ist ein schöner tag und wir sind alle glücklich. "
+            "ich gehe heute auf den markt. kommst du mit mir? in indien werden viele sprachen gesprochen. "
+            "er sagte, dass er morgen kommt. wir brauchen wasser. dieses buch ist sehr gut. "
+            "der verkehr in der stadt ist ein problem. ich mag blumen und gartenarbeit. "
+            "wo kann ich günstiges essen finden? mein hobby ist lesen. laufen am morgen ist gut für die gesundheit."
+        ),
+        "pt": (
+            "a rápida raposa marrom pula sobre o cão preguiçoso. este é um bom dia e estamos todos felizes. "
+            "hoje vou ao mercado. você vem comigo? na índia falam-se muitas línguas. "
+            "ele disse que virá amanhã. precisamos de água. este livro é muito bom. "
+            "o trânsito na cidade é um problema. eu gosto de flores e de jardinagem. "
+            "onde posso encontrar comida barata? o meu passatempo é ler. correr de manhã é bom para a saúde."
+        ),
+        "it": (
+            "la veloce volpe marrone salta sopra il cane pigro. questa è una bella giornata e siamo tutti felici. "
+            "oggi vado al mercato. vieni con me? in india si parlano molte lingue. "
+            "lui ha detto che verrà domani. abbiamo bisogno di acqua. questo libro è molto buono. "
+            "il traffico in città è un problema. mi piacciono i fiori e il giardinaggio. "
+            "dove posso trovare cibo economico? il mio hobby è leggere. correre la mattina fa bene alla salute."
+        ),
+    },
+}
+
+# Log-prior bonus per trigram for the default language, so short or
+# ambiguous Latin queries stay English unless another language clearly wins.
+DEFAULT_LANGUAGE_BONUS = 0.35
+
+# Languages results can be translated into (keep in sync with translation.LANG_MAP).
+# Anything else the Latin model picks ("piano lessons" -> it, "namaste" -> pt)
+# is an English query using a borrowed word, as far as search is concerned.
+SUPPORTED_LANGUAGES = frozenset({"en", "mr", "hi", "kn", "ta", "te", "gu", "bn", "pa", "ml", "or", "ur", "ne"})
+
+# Devanagari short queries ("मौसम", "समाचार") barely separate hi/mr/ne; below
+# this per-trigram margin they go to the script's most common language.
+SCRIPT_DEFAULT_LANGUAGE = {"deva": "hi"}
+SCRIPT_DEFAULT_MARGIN = float(os.getenv("LANGID_SCRIPT_DEFAULT_MARGIN", 0.1))
+
+
+def _trigrams(text: str):
+    padded = f"  {text} "
+    return (padded[i:i + 3] for i in range(len(padded) - 2))
+
+
+class NgramModel:
+    """Character-trigram naive Bayes classifier with add-one smoothing."""
+
+    def __init__(self, seed_text: Dict[str, str]):
+        self.log_probs: Dict[str, Dict[str, float]] = {}
+        self.unseen: Dict[str, float] = {}
+        vocab = set()
+        counts = {}
+        for lang, text in seed_text.items():
+            counts[lang] = Counter(_trigrams(normalize_query(text)))
+            vocab.update(counts[lang])
+        for lang, counter in counts.items():
+            denom = sum(counter.values()) + len(vocab) + 1
+            self.log_probs[lang] = {gram: math.log((n + 1) / denom) for gram, n in counter.items()}
+            self.unseen[lang] = math.log(1 / denom)
+
+    def classify(self, text: str) -> Tuple[str, float]:
+        """Return (language, per-trigram log-likelihood margin over the runner-up)."""
+        grams = list(_trigrams(text))
+        scores = {}
+        for lang, table in self.log_probs.items():
+            unseen = self.unseen[lang]
+            score = sum(table.get(gram, unseen) for gram in grams)
+            if lang == DEFAULT_LANGUAGE:
+                score += DEFAULT_LANGUAGE_BONUS * len(grams)
+            scores[lang] = score
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        margin = (ranked[0][1] - ranked[1][1]) / max(len(grams), 1) if len(ranked) > 1 else 0.0
+        return ranked[0][0], margin
+
+
+@lru_cache(maxsize=None)
+def _model(script: str) -> NgramModel:
+    # Built once per script on first use
+    return NgramModel(SEED_TEXT[script])
+
+
+def normalize_query(text: str) -> str:
+    text = unicodedata.normalize("NFC", text or "").lower()
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def _script_of(char: str) -> Optional[str]:
+    code = ord(char)
+    if code < 0x0250:
+        return "latn" if char.isalpha() else None
+    for start, end, script in SCRIPT_RANGES:
+        if start <= code <= end:
+            return script
+    return None
+
+
+def dominant_script(text: str) -> Optional[str]:
+    counts = Counter(script for script in map(_script_of, text) if script)
+    if not counts:
+        return None
+    script, count = counts.most_common(1)[0]
+    if count / sum(counts.values()) < SCRIPT_DOMINANCE:
+        return None
+    return script
+
+
+@lru_cache(maxsize=LANGID_CACHE_SIZE)
+def _detect_normalized(text: str) -> str:
+    script = dominant_script(text)
+    if script is None:
+        return DEFAULT_LANGUAGE
+    if script in SEED_TEXT:
+        lang, margin = _model(script).classify(text)
+        if margin < SCRIPT_DEFAULT_MARGIN and script in SCRIPT_DEFAULT_LANGUAGE:
+            return SCRIPT_DEFAULT_LANGUAGE[script]
+        if script == "latn" and lang not in SUPPORTED_LANGUAGES:
+            return DEFAULT_LANGUAGE
+        return lang
+    return script
+
+
+def detect_language(text: str) -> str:
+    """
+    Detect the language of a search query: Unicode script ranges first, a
+    trigram model for scripts shared by several languages (Devanagari,
+    Latin, with low-margin Devanagari going to Hindi and Latin languages
+    outside SUPPORTED_LANGUAGES to English), DEFAULT_LANGUAGE when nothing
+    matches. Results are cached per normalized query and are deterministic.
+    """
+    return _detect_normalized(normalize_query(text))
@@ -0,0 +1,234 @@
+# loadgen.py
+"""
+Webhook replay load generator for the ingestion path.
+
+Typical local run (Redis on localhost, in-memory vector store):
+
+    INGEST_METRICS_STREAM=ingest_metrics VECTOR_BACKEND=local python worker.py   # one or more
+    INGEST_METRICS_STREAM=ingest_metrics VECTOR_BACKEND=local uvicorn app:app --port 8000
+    python loadgen.py synthesize --count 2000 --out payloads.jsonl
+    python loadgen.py replay --payloads payloads.jsonl --rate 50 --shape burst --burst-size 25
+
+Real payloads can be captured by starting app.py/main.py with
+WEBHOOK_RECORD_PATH=payloads.jsonl.
+
+Timings come from INGEST_METRICS_STREAM records written by both processes:
+"api" covers the chunked embedding done inside app.py's webhook handler,
+"worker" the queued job, measured from send until the worker finished it.
+
+"searchable" is the end-to-end time from send until the target's
+/debug/document/{uid} reports chunks for the document, i.e. until /search
+can return it (app.py targets; with VECTOR_BACKEND=local that is the
+target's own in-memory index, with Pinecone it includes index freshness).
+Disable it with --no-searchable for main.py/webhook.py targets, whose
+workers write a different ID layout.
+"""
+import os
+import json
+import time
+import random
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+from urllib.parse import urljoin
+
+import numpy as np
+import redis
+import requests
+
+WORDS = (
+    "traffic city flower garden budget hobby jogging fitness travel market "
+    "recipe festival monsoon river temple cricket railway school library "
+    "health science music cinema village harvest coffee mountain ocean"
+).split()
+
+
+def synthesize_payloads(count: int, body_words: int, seed: int = 0) -> List[Dict]:
+    """Build Contentstack-shaped entry.update payloads with random text."""
+    rng = random.Random(seed)
+    payloads = []
+    for i in range(count):
+        title = " ".join(rng.choices(WORDS, k=rng.randint(3, 8))).title()
+        body = " ".join(rng.choices(WORDS, k=max(1, int(rng.gauss(body_words, body_words / 4)))))
+        payloads.append({
+            "event": "entry.update",
+            "data": {
+                "entry": {"uid": f"bltsynth{i:06d}", "title": title, "body": f"<p>{body}</p>", "locale": "en-us"},
+                "content_type": {"uid": "page"},
+            },
+        })
+    return payloads
+
+
+def schedule(count: int, rate: float, shape: str, burst_size: int) -> List[float]:
+    """Send offsets in seconds; both shapes average `rate` events/sec."""
+    if shape == "burst":
+        return [(i // burst_size) * burst_size / rate for i in range(count)]
+    return [i / rate for i in range(count)]
+
+
+def percentiles(values: List[float]) -> Dict:
+    if not values:
+        return {}
+    arr = np.asarray(values)
+    return {f"p{p}": round(float(np.percentile(arr, p)), 2) for p in (50, 95, 99)} | {"max": round(float(arr.max()), 2)}
+
+
+def replay(args):
+    with open(args.payloads, encoding="utf-8") as f:
+        templates = [json.loads(line) for line in f if line.strip()]
+    redis_client = redis.StrictRedis(host=args.redis_host, port=args.redis_port, db=0)
+    if args.metrics_stream:
+        redis_client.delete(args.metrics_stream)
+
+    offsets = schedule(args.count, args.rate, args.shape, args.burst_size)
+    sent_at: Dict[str, float] = {}
+    searchable_at: Dict[str, float] = {}
+    accepted = []
+    lock = threading.Lock()
+    session = requests.Session()
+    session.mount("http://", requests.adapters.HTTPAdapter(pool_maxsize=args.concurrency * 2))
+    debug_url = urljoin(args.url, "/debug/document/")
+    pollers = ThreadPoolExecutor(max_workers=args.concurrency, thread_name_prefix="searchable")
+    poll_deadline = [float("inf")]  # set once sending is done
+
+    def wait_searchable(uid: str):
+        """Poll the target until the document has chunks in its index."""
+        while time.time() < poll_deadline[0]:
+            try:
+                if session.get(debug_url + uid, timeout=10).json().get("chunks_found", 0) > 0:
+                    with lock:
+                        searchable_at[uid] = time.time()
+                    return
+            except Exception:
+                pass
+            time.sleep(args.poll_interval)
+
+    def send(seq: int):
+        payload = json.loads(json.dumps(templates[seq % len(templates)]))
+        entry = payload.setdefault("data", {}).setdefault("entry", {})
+        # Unique uid per event so completions can be matched to sends
+        entry["uid"] = f"{entry.get('uid', 'blt')}lg{seq}"
+        with lock:
+            sent_at[entry["uid"]] = time.time()
+        try:
+            res = session.post(args.url, json=payload, timeout=30)
+            ok = res.status_code < 300 and res.json().get("status") not in ("error", "skipped")
+        except Exception:
+            ok = False
+        if ok:
+            with lock:
+                accepted.append(time.time())
+            if args.searchable:
+                pollers.submit(wait_searchable, entry["uid"])
+
+    queue_depths = []
+    stop_sampling = threading.Event()
+
+    def sample_queue():
+        while not stop_sampling.is_set():
+            queue_depths.append(redis_client.llen(args.queue_key))
+            stop_sampling.wait(0.25)
+
+    sampler = threading.Thread(target=sample_queue, daemon=True)
+    sampler.start()
+
+    run_start = time.time()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        for seq, offset in enumerate(offsets):
+            delay = run_start + offset - time.time()
+            if delay > 0:
+                time.sleep(delay)
+            pool.submit(send, seq)
+    send_elapsed = time.time() - run_start
+
+    # Wait for the workers to drain what was accepted
+    metrics = {"api": {}, "worker": {}}
+    deadline = time.time() + args.drain_timeout
+    poll_deadline[0] = deadline
+    while args.metrics_stream and time.time() < deadline:
+        for _, fields in redis_client.xrange(args.metrics_stream):
+            record = {k.decode(): v.decode() for k, v in fields.items()}
+            metrics.setdefault(record.get("source", "worker"), {})[record["uid"]] = record
+        if len(metrics["worker"]) >= len(accepted):
+            break
+        time.sleep(0.5)
+    stop_sampling.set()
+    sampler.join()
+    pollers.shutdown(wait=True)
+
+    def summarize(records: Dict[str, Dict]) -> Dict:
+        done = [m for uid, m in records.items() if uid in sent_at]
+        cpu = [float(m["cpu_ms"]) for m in done]
+        drain_elapsed = (max(float(m["finished_at"]) for m in done) - run_start) if done else 0
+        return {
+            "processed": len(done),
+            "processed_per_sec": round(len(done) / drain_elapsed, 2) if drain_elapsed else 0,
+            "queue_wait_ms": percentiles([(float(m["started_at"]) - float(m["enqueued_at"])) * 1000 for m in done]),
+            "send_to_done_ms": percentiles([(float(m["finished_at"]) - sent_at[m["uid"]]) * 1000 for m in done]),
+            "cpu_ms_per_event": round(float(np.mean(cpu)), 2) if cpu else None,
+        }
+
+    report = {
+        "target": args.url,
+        "shape": args.shape,
+        "offered_rate": args.rate,
+        "sent": len(sent_at),
+        "accepted": len(accepted),
+        "accepted_per_sec": round(len(accepted) / send_elapsed, 2) if send_elapsed else 0,
+        "queue_depth": {"max": max(queue_depths, default=0), "mean": round(float(np.mean(queue_depths)), 2) if queue_depths else 0},
+        # Chunked indexing inside the webhook handler (app.py only)
+        "api": summarize(metrics["api"]),
+        # Queued job, from send until the worker finished it
+        "worker": summarize(metrics["worker"]),
+    }
+    if args.searchable:
+        # From send until /debug/document/{uid} on the target finds the document's chunks
+        report["searchable"] = {
+            "documents": len(searchable_at),
+            "not_searchable": len(accepted) - len(searchable_at),
+            "send_to_searchable_ms": percentiles([(t - sent_at[uid]) * 1000 for uid, t in searchable_at.items()]),
+        }
+    print(json.dumps(report, indent=2))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay webhook payloads to measure ingestion throughput")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    syn = sub.add_parser("synthesize", help="write synthetic webhook payloads as JSONL")
+    syn.add_argument("--count", type=int, default=1000)
+    syn.add_argument("--body-words", type=int, default=400)
+    syn.add_argument("--seed", type=int, default=0)
+    syn.add_argument("--out", required=True)
+
+    rep = sub.add_parser("replay", help="replay recorded/synthetic payloads against a webhook endpoint")
+    rep.add_argument("--payloads", required=True)
+    rep.add_argument("--url", default="http://localhost:8000/webhook")
+    rep.add_argument("--count", type=int, default=1000)
+    rep.add_argument("--rate", type=float, default=20, help="average events/sec")
+    rep.add_argument("--shape", choices=["constant", "burst"], default="constant")
+    rep.add_argument("--burst-size", type=int, default=20)
+    rep.add_argument("--concurrency", type=int, default=32)
+    rep.add_argument("--redis-host", default=os.getenv("REDIS_HOST", "localhost"))
+    rep.add_argument("--redis-port", type=int, default=int(os.getenv("REDIS_PORT", 6379)))
+    rep.add_argument("--queue-key", default="contentstack_jobs", help="use rq:queue:contentstack for main.py")
+    rep.add_argument("--metrics-stream", default=os.getenv("INGEST_METRICS_STREAM", "ingest_metrics"))
+    rep.add_argument("--drain-timeout", type=float, default=120)
+    rep.add_argument("--no-searchable", dest="searchable", action="store_false",
+                     help="skip polling /debug/document/{uid} for end-to-end searchability")
+    rep.add_argument("--poll-interval", type=float, default=0.1, help="seconds between searchability polls")
+
+    args = parser.parse_args()
+    if args.command == "synthesize":
+        with open(args.out, "w", encoding="utf-8") as f:
+            for payload in synthesize_payloads(args.count, args.body_words, args.seed):
+                f.write(json.dumps(payload) + "\n")
+        print(f"Wrote {args.count} payloads to {args.out}")
+    else:
+        replay(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+# local_index.py
+import threading
+from types import SimpleNamespace
+from typing import Dict, List, Optional
+
+import numpy as np
+
+
+class LocalIndex:
+    """
+    In-memory stand-in for a Pinecone index (upsert/query/fetch/list/delete)
+    used for load tests and local development. Select it with
+    VECTOR_BACKEND=local.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._namespaces: Dict[str, Dict[str, SimpleNamespace]] = {}
+
+    def _namespace(self, namespace: Optional[str]) -> Dict[str, SimpleNamespace]:
+        return self._namespaces.setdefault(namespace or "", {})
+
+    def upsert(self, vectors: List[Dict], namespace: Optional[str] = None):
+        with self._lock:
+            store = self._namespace(namespace)
+            for v in vectors:
+                store[v["id"]] = SimpleNamespace(
+                    id=v["id"],
+                    values=np.asarray(v["values"], dtype=np.float32),
+                    metadata=v.get("metadata") or {},
+                )
+        return {"upserted_count": len(vectors)}
+
+    def upsert_arrays(self, ids: List[str], values: np.ndarray, metadatas: List[Dict], namespace: Optional[str] = None):
+        """Store rows of a float32 matrix as views, without per-vector copies."""
+        values = np.ascontiguousarray(values, dtype=np.float32)
+        with self._lock:
+            store = self._namespace(namespace)
+            for vector_id, row, metadata in zip(ids, values, metadatas):
+                store[vector_id] = SimpleNamespace(id=vector_id, values=row, metadata=metadata or {})
+        return {"upserted_count": len(ids)}
+
+    def delete(self, ids: List[str], namespace: Optional[str] = None):
+        with self._lock:
+            store = self._namespace(namespace)
+            for vector_id in ids:
+                store.pop(vector_id, None)
+        return {}
+
+    def fetch(self, ids: List[str], namespace: Optional[str] = None):
+        with self._lock:
+            store = self._namespace(namespace)
+            found = {vector_id: store[vector_id] for vector_id in ids if vector_id in store}
+        return SimpleNamespace(vectors=found, namespace=namespace or "")
+
+    def list(self, prefix: Optional[str] = None, namespace: Optional[str] = None, limit: int = 100):
+        """Yield pages of IDs, like Index.list on serverless indexes."""
+        with self._lock:
+            ids = sorted(i for i in self._namespace(namespace) if not prefix or i.startswith(prefix))
+        for i in range(0, len(ids), limit):
+            yield ids[i:i + limit]
+
+    def query(self, vector, top_k: int = 5, include_metadata: bool = True,
+              filter: Optional[Dict] = None, namespace: Optional[str] = None, **kwargs):
+        with self._lock:
+            candidates = [v for v in self._namespace(namespace).values() if _matches_filter(v.metadata, filter)]
+        if not candidates:
+            return {"matches": []}
+
+        matrix = np.stack([v.values for v in candidates])
+        query = np.asarray(vector, dtype=np.float32)
+        denom = np.linalg.norm(matrix, axis=1) * (np.linalg.norm(query) or 1.0)
+        scores = (matrix @ query) / np.where(denom == 0, 1.0, denom)
+
+        top = np.argsort(-scores)[:top_k]
+        return {"matches": [
+            {
+                "id": candidates[i].id,
+                "score": float(scores[i]),
+                "metadata": candidates[i].metadata if include_metadata else None,
+            }
+            for i in top
+        ]}
+
+    def describe_index_stats(self):
+        with self._lock:
+            namespaces = {name: {"vector_count": len(store)} for name, store in self._namespaces.items()}
+        return {"namespaces": namespaces, "total_vector_count": sum(n["vector_count"] for n in namespaces.values())}
+
+
+def _matches_filter(metadata: Dict, filter: Optional[Dict]) -> bool:
+    """Support the equality subset of Pinecone's metadata filter language."""
+    if not filter:
+        return True
+    for key, condition in filter.items():
+        if isinstance(condition, dict):
+            if "$eq" in condition and metadata.get(key) != condition["$eq"]:
+                return False
+            if "$in" in condition and metadata.get(key) not in condition["$in"]:
+                return False
+        elif metadata.get(key) != condition:
+            return False
+    return True
@@ -1,24 +1,27 @@
 import os
+import time
 import logging
 from fastapi import FastAPI, Request
-from redis import Redis
 from rq import Queue
 from dotenv import load_dotenv
 from worker import process_entry
-from utils import strip_html_tags
+from utils import strip_html_tags, record_webhook_payload
+from redis_connection import get_redis
+import serialization
 
 load_dotenv()
 app = FastAPI()
 logging.basicConfig(level=logging.INFO)
 
-# Redis connection & queue
-redis_conn = Redis(host="localhost", port=6379)
-queue = Queue("contentstack", connection=redis_conn)
+# Redis connection & queue (run workers with: rq worker contentstack --serializer serialization.default_serializer)
+redis_conn = get_redis()
+queue = Queue("contentstack", connection=redis_conn, serializer=serialization.default_serializer)
 
 @app.post("/webhook")
 async def webhook_receiver(request: Request):
     payload = await request.json()
     logging.info(f"📩 Webhook received: {payload}")
+    record_webhook_payload(payload)
 
     try:
         event = payload.get("event")
@@ -41,7 +44,8 @@ async def webhook_receiver(request: Request):
             "body": body,
             "locale": locale,
             "content_type": content_type,
-            "event": event
+            "event": event,
+            "enqueued_at": time.time()
         }
 
         # Enqueue job for background processing
@@ -1,7 +1,8 @@
 # pinecone_client.py
 import os
+import threading
+import numpy as np
 from dotenv import load_dotenv
-from pinecone import Pinecone, ServerlessSpec
 
 # Load environment variables from .env
 load_dotenv()
@@ -9,26 +10,88 @@ load_dotenv()
 PINECONE_API_KEY = os.getenv("PINECONE_API_KEY")
 PINECONE_ENV = os.getenv("PINECONE_ENV")  # optional
 INDEX_NAME = os.getenv("PINECONE_INDEX")
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "pinecone")  # "pinecone" or "local" (in-memory stand-in)
+PINECONE_TRANSPORT = os.getenv("PINECONE_TRANSPORT", "rest")  # "rest" or "grpc" (protobuf, needs pinecone[grpc])
+UPSERT_BATCH_SIZE = int(os.getenv("PINECONE_UPSERT_BATCH_SIZE", "100"))
 
-# sanity check
-if not PINECONE_API_KEY or not INDEX_NAME:
-    raise ValueError("PINECONE_API_KEY and PINECONE_INDEX must be set in environment variables")
-
-# Create Pinecone client
-pc = Pinecone(api_key=PINECONE_API_KEY, environment=PINECONE_ENV)
-
-# Check if index exists, create if not
-existing_indexes = [i.name for i in pc.list_indexes()]
-if INDEX_NAME not in existing_indexes:
-    pc.create_index(
-        name=INDEX_NAME,
-        dimension=768,
-        metric="cosine",
-        spec=ServerlessSpec(cloud="aws", region="us-west-2")
-    )
+if VECTOR_BACKEND == "local":
+    from local_index import LocalIndex
+    INDEX_NAME = INDEX_NAME or "local"
+    pc = None
+    index = LocalIndex()
+else:
+    from pinecone import ServerlessSpec
+    if PINECONE_TRANSPORT == "grpc":
+        from pinecone.grpc import PineconeGRPC as Pinecone
+    else:
+        from pinecone import Pinecone
+
+    # sanity check
+    if not PINECONE_API_KEY or not INDEX_NAME:
+        raise ValueError("PINECONE_API_KEY and PINECONE_INDEX must be set in environment variables")
+
+    # Create Pinecone client
+    pc = Pinecone(api_key=PINECONE_API_KEY, environment=PINECONE_ENV)
+
+    # Check if index exists, create if not
+    existing_indexes = [i.name for i in pc.list_indexes()]
+    if INDEX_NAME not in existing_indexes:
+        pc.create_index(
+            name=INDEX_NAME,
+            dimension=768,
+            metric="cosine",
+            spec=ServerlessSpec(cloud="aws", region="us-west-2")
+        )
+
+    # Connect to the index
+    index = pc.Index(INDEX_NAME)
+
+# -------------------------------
+# Client / index pool
+# -------------------------------
+# Pinecone clients and index handles keep their own HTTP connection pools,
+# so they are created once per (api key, index) and reused across requests.
+_clients = {PINECONE_API_KEY: pc}
+_indexes = {(PINECONE_API_KEY, INDEX_NAME): index}
+_pool_lock = threading.Lock()
+
+def get_index(index_name: str = None, api_key: str = None):
+    """
+    Return a pooled index handle, defaulting to the service-wide index.
+    """
+    api_key = api_key or PINECONE_API_KEY
+    index_name = index_name or INDEX_NAME
+    key = (api_key, index_name)
+    if key in _indexes:
+        return _indexes[key]
+    with _pool_lock:
+        if key not in _indexes:
+            if VECTOR_BACKEND == "local":
+                _indexes[key] = LocalIndex()
+            else:
+                client = _clients.get(api_key)
+                if client is None:
+                    client = _clients[api_key] = Pinecone(api_key=api_key)
+                _indexes[key] = client.Index(index_name)
+        return _indexes[key]
 
-# Connect to the index
-index = pc.Index(INDEX_NAME)
+# -------------------------------
+# Wire format
+# -------------------------------
+def to_wire(values):
+    """
+    Convert a vector for the active transport. The local store keeps float32
+    arrays as-is; the JSON REST client needs a list of Python floats, so that
+    conversion happens once here instead of at every call site.
+    """
+    if VECTOR_BACKEND == "local" or not isinstance(values, np.ndarray):
+        return values
+    return values.tolist()
+
+def _vectors_to_wire(vectors: list) -> list:
+    if VECTOR_BACKEND == "local":
+        return vectors
+    return [{**v, "values": to_wire(v["values"])} for v in vectors]
 
 # -------------------------------
 # Upsert a vector
@@ -37,14 +100,74 @@ def upsert_vector(vector_id: str, vector: list, metadata: dict):
     """
     Upsert a single vector into Pinecone
     """
-    index.upsert([{"id": vector_id, "values": vector, "metadata": metadata}])
+    index.upsert([{"id": vector_id, "values": to_wire(vector), "metadata": metadata}])
+
+def upsert_vectors(vectors: list, namespace: str = None, target_index=None, batch_size: int = UPSERT_BATCH_SIZE):
+    """
+    Upsert a list of {"id", "values", "metadata"} dicts in batches.
+    "values" may be a list or a float32 array (e.g. a row of encode_texts()).
+    """
+    target_index = target_index or index
+    for i in range(0, len(vectors), batch_size):
+        target_index.upsert(_vectors_to_wire(vectors[i:i + batch_size]), namespace=namespace)
+
+def upsert_arrays(ids: list, values: np.ndarray, metadatas: list, namespace: str = None,
+                  target_index=None, batch_size: int = UPSERT_BATCH_SIZE):
+    """
+    Upsert a (n, dim) float32 matrix with parallel lists of IDs and metadata.
+    The local store keeps row views of one contiguous buffer.
+    """
+    target_index = target_index or index
+    values = np.ascontiguousarray(values, dtype=np.float32)
+    if VECTOR_BACKEND == "local":
+        target_index.upsert_arrays(ids, values, metadatas, namespace=namespace)
+        return
+    upsert_vectors(
+        [{"id": i, "values": row, "metadata": m} for i, row, m in zip(ids, values, metadatas)],
+        namespace=namespace, target_index=target_index, batch_size=batch_size,
+    )
+
+def delete_vectors(ids: list, namespace: str = None, target_index=None):
+    """
+    Delete vectors by ID
+    """
+    target_index = target_index or index
+    if ids:
+        target_index.delete(ids=ids, namespace=namespace)
 
 # -------------------------------
 # Query vectors
 # -------------------------------
-def query_vector(vector: list, top_k: int = 5,filter: dict = None):
+def query_vector(vector: list, top_k: int = 5,filter: dict = None, namespace: str = None, target_index=None):
     """
     Query Pinecone index and return top_k results
     """
-    res = index.query(vector=vector, top_k=top_k, include_metadata=True)
+    target_index = target_index or index
+    res = target_index.query(vector=to_wire(vector), top_k=top_k, include_metadata=True, filter=filter, namespace=namespace)
     return res
+
+# -------------------------------
+# List / fetch vectors by ID
+# -------------------------------
+FETCH_BATCH_SIZE = int(os.getenv("PINECONE_FETCH_BATCH_SIZE", "100"))
+
+def list_vector_ids(prefix: str, namespace: str = None, target_index=None) -> list:
+    """
+    List every vector ID starting with prefix (paginated on the server).
+    """
+    target_index = target_index or index
+    ids = []
+    for page in target_index.list(prefix=prefix, namespace=namespace):
+        ids.extend(page)
+    return ids
+
+def fetch_vectors(ids: list, namespace: str = None, target_index=None, batch_size: int = FETCH_BATCH_SIZE) -> dict:
+    """
+    Fetch vectors by ID in batches, returning {id: vector}.
+    """
+    target_index = target_index or index
+    vectors = {}
+    for i in range(0, len(ids), batch_size):
+        res = target_index.fetch(ids=ids[i:i + batch_size], namespace=namespace)
+        vectors.update(res.vectors)
+    return vectors
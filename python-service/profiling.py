@@ -0,0 +1,368 @@
+# profiling.py
+"""
+On-demand introspection for live processes: a wall-clock sampling profiler
+producing collapsed stacks (flamegraph.pl / speedscope input), tracemalloc
+snapshots and diffs, model and process memory, and thread statistics.
+
+Nothing runs until asked for. Profiles are capped at PROFILE_MAX_SECONDS,
+only one runs per process at a time (a second request fails immediately),
+and work happens on dedicated threads, one for profiles and one for
+tracemalloc snapshots, so the default executor used by /search is not taken.
+Processes without an HTTP server (worker.py, change_stream.py) answer
+profile requests published on PROFILE_CONTROL_CHANNEL:<role>.
+"""
+import os
+import sys
+import json
+import time
+import socket
+import logging
+import threading
+import tracemalloc
+from collections import Counter, OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# -------------------------------
+# Configuration
+# -------------------------------
+PROFILE_MAX_SECONDS = float(os.getenv("PROFILE_MAX_SECONDS", 60))
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", 10))  # sampling period
+PROFILE_MIN_INTERVAL_MS = 1.0
+PROFILE_MAX_DEPTH = int(os.getenv("PROFILE_MAX_DEPTH", 64))
+TRACEMALLOC_FRAMES = int(os.getenv("TRACEMALLOC_FRAMES", 1))  # traceback depth, each frame adds overhead
+TRACEMALLOC_MAX_SNAPSHOTS = int(os.getenv("TRACEMALLOC_MAX_SNAPSHOTS", 4))  # oldest are dropped
+STATS_MAX_ROWS = 200
+PROFILE_CONTROL_CHANNEL = os.getenv("PROFILE_CONTROL_CHANNEL", "profiling:requests")
+PROFILE_RESULT_PREFIX = "profiling:result:"
+PROFILE_RESULT_TTL = 600
+
+# Innermost frames of threads that are parked waiting for work
+IDLE_FRAMES = {"selectors.py:select", "threading.py:wait", "queue.py:get", "thread.py:_worker"}
+
+# One thread each for profiles and snapshots: bounds overhead, and a
+# snapshot or diff never queues behind a running profile
+executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="profiler")
+snapshot_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="tracemalloc")
+_profile_lock = threading.Lock()
+
+
+class ProfilerBusy(Exception):
+    """Another profile is already running in this process."""
+
+
+# -------------------------------
+# Sampling profiler
+# -------------------------------
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}"
+
+
+def sample_stacks(seconds: float, interval_ms: float = PROFILE_INTERVAL_MS, include_idle: bool = False) -> Dict:
+    """
+    Sample every thread's Python stack each interval_ms for `seconds` of
+    wall-clock time. Stacks are collapsed to "thread;outer;...;inner" with
+    sample counts; threads parked in IDLE_FRAMES are dropped unless
+    include_idle is set.
+    """
+    if not _profile_lock.acquire(blocking=False):
+        raise ProfilerBusy("A profile is already running")
+    try:
+        return _sample_stacks(seconds, interval_ms, include_idle)
+    finally:
+        _profile_lock.release()
+
+
+def submit_profile(seconds: float, interval_ms: float = PROFILE_INTERVAL_MS, include_idle: bool = False) -> Future:
+    """
+    Claim the profiler and run sample_stacks on the profiler thread.
+    Raises ProfilerBusy right away, instead of queueing, while one runs.
+    """
+    if not _profile_lock.acquire(blocking=False):
+        raise ProfilerBusy("A profile is already running")
+
+    def run():
+        try:
+            return _sample_stacks(seconds, interval_ms, include_idle)
+        finally:
+            _profile_lock.release()
+
+    try:
+        return executor.submit(run)
+    except Exception:
+        _profile_lock.release()
+        raise
+
+
+def _sample_stacks(seconds: float, interval_ms: float, include_idle: bool) -> Dict:
+    seconds = min(max(seconds, 0.1), PROFILE_MAX_SECONDS)
+    interval = max(interval_ms, PROFILE_MIN_INTERVAL_MS) / 1000
+    sampler = threading.get_ident()
+    counts = Counter()
+    samples = 0
+    sampler_seconds = 0.0
+
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        started = time.perf_counter()
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == sampler:
+                continue
+            stack = []
+            while frame is not None and len(stack) < PROFILE_MAX_DEPTH:
+                stack.append(_frame_label(frame))
+                frame = frame.f_back
+            if not stack or (not include_idle and stack[0] in IDLE_FRAMES):
+                continue
+            stack.append(names.get(ident, str(ident)))
+            counts[";".join(reversed(stack))] += 1
+        samples += 1
+        spent = time.perf_counter() - started
+        sampler_seconds += spent
+        time.sleep(max(interval - spent, 0))
+
+    return {
+        "seconds": seconds,
+        "interval_ms": interval * 1000,
+        "samples": samples,
+        "sampler_ms": round(sampler_seconds * 1000, 1),
+        "stacks": dict(counts.most_common()),
+    }
+
+
+def to_collapsed(profile: Dict) -> str:
+    """One "stack count" line per stack, as read by flamegraph.pl and speedscope."""
+    return "\n".join(f"{stack} {count}" for stack, count in profile["stacks"].items()) + "\n"
+
+
+# -------------------------------
+# tracemalloc snapshots
+# -------------------------------
+_snapshots: "OrderedDict[str, tracemalloc.Snapshot]" = OrderedDict()
+_snapshot_lock = threading.Lock()
+
+# Allocations made by tracemalloc and the import system are noise
+_SNAPSHOT_FILTERS = [
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+]
+
+
+def tracing_status() -> Dict:
+    current, peak = tracemalloc.get_traced_memory()
+    with _snapshot_lock:
+        labels = list(_snapshots)
+    return {
+        "tracing": tracemalloc.is_tracing(),
+        "frames": tracemalloc.get_traceback_limit(),
+        "traced_bytes": current,
+        "traced_peak_bytes": peak,
+        "tracemalloc_overhead_bytes": tracemalloc.get_tracemalloc_memory(),
+        "snapshots": labels,
+    }
+
+
+def start_tracing(frames: int = TRACEMALLOC_FRAMES) -> Dict:
+    """Start tracing allocations; only allocations made from now on are seen."""
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(max(frames, 1))
+    return tracing_status()
+
+
+def stop_tracing() -> Dict:
+    tracemalloc.stop()
+    with _snapshot_lock:
+        _snapshots.clear()
+    return tracing_status()
+
+
+def _statistics(stats, limit: int) -> List[Dict]:
+    rows = []
+    for stat in stats[:min(limit, STATS_MAX_ROWS)]:
+        row = {
+            "location": [f"{frame.filename}:{frame.lineno}" for frame in stat.traceback],
+            "size_bytes": stat.size,
+            "count": stat.count,
+        }
+        if hasattr(stat, "size_diff"):
+            row["size_diff_bytes"] = stat.size_diff
+            row["count_diff"] = stat.count_diff
+        rows.append(row)
+    return rows
+
+
+def take_snapshot(label: Optional[str] = None, limit: int = 25, group_by: str = "lineno") -> Dict:
+    """
+    Snapshot traced allocations under `label` (kept for later diffs, at most
+    TRACEMALLOC_MAX_SNAPSHOTS) and return the largest allocation sites.
+    """
+    if not tracemalloc.is_tracing():
+        raise ValueError("tracemalloc is not tracing, start it first")
+    label = label or time.strftime("%Y%m%dT%H%M%S")
+    snapshot = tracemalloc.take_snapshot().filter_traces(_SNAPSHOT_FILTERS)
+    with _snapshot_lock:
+        _snapshots.pop(label, None)
+        _snapshots[label] = snapshot
+        while len(_snapshots) > TRACEMALLOC_MAX_SNAPSHOTS:
+            _snapshots.popitem(last=False)
+    stats = snapshot.statistics(group_by)
+    return {
+        "label": label,
+        "total_bytes": sum(stat.size for stat in stats),
+        "top": _statistics(stats, limit),
+    }
+
+
+def compare_snapshots(old: str, new: str, limit: int = 25, group_by: str = "lineno") -> Dict:
+    """Allocation sites that grew (or shrank) the most between two labeled snapshots."""
+    with _snapshot_lock:
+        missing = [label for label in (old, new) if label not in _snapshots]
+        if missing:
+            raise KeyError(f"Unknown snapshot(s): {', '.join(missing)}")
+        old_snapshot, new_snapshot = _snapshots[old], _snapshots[new]
+    stats = new_snapshot.compare_to(old_snapshot, group_by)
+    return {
+        "old": old,
+        "new": new,
+        "size_diff_bytes": sum(stat.size_diff for stat in stats),
+        "top": _statistics(stats, limit),
+    }
+
+
+# -------------------------------
+# Memory / thread statistics
+# -------------------------------
+def process_memory() -> Dict:
+    """Current and peak resident set size of this process."""
+    memory = {}
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                key, _, value = line.partition(":")
+                if key in ("VmRSS", "VmHWM"):
+                    memory["rss_bytes" if key == "VmRSS" else "rss_peak_bytes"] = int(value.split()[0]) * 1024
+    except OSError:
+        import resource
+        # ru_maxrss is KiB on Linux, bytes on macOS
+        scale = 1 if sys.platform == "darwin" else 1024
+        memory["rss_peak_bytes"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+    return memory
+
+
+def model_memory(model) -> Optional[Dict]:
+    """Parameter and buffer bytes of a torch-backed model (SentenceTransformer, CrossEncoder)."""
+    if model is None:
+        return None
+    module = model if hasattr(model, "parameters") else getattr(model, "model", None)
+    if module is None or not hasattr(module, "parameters"):
+        return None
+    parameters = list(module.parameters())
+    buffers = list(module.buffers())
+    return {
+        "class": type(model).__name__,
+        "parameters": sum(p.numel() for p in parameters),
+        "parameter_bytes": sum(p.numel() * p.element_size() for p in parameters),
+        "buffer_bytes": sum(b.numel() * b.element_size() for b in buffers),
+        "devices": sorted({str(p.device) for p in parameters}),
+        "dtypes": sorted({str(p.dtype) for p in parameters}),
+    }
+
+
+def thread_stats() -> Dict:
+    threads = threading.enumerate()
+    return {
+        "count": len(threads),
+        "threads": [{"name": t.name, "daemon": t.daemon, "ident": t.ident} for t in threads],
+    }
+
+
+def executor_stats(pool) -> Optional[Dict]:
+    """Size and backlog of a ThreadPoolExecutor (e.g. the loop's default executor)."""
+    if pool is None:
+        return None
+    work_queue = getattr(pool, "_work_queue", None)
+    return {
+        "max_workers": getattr(pool, "_max_workers", None),
+        "threads": len(getattr(pool, "_threads", ())),
+        "queued": work_queue.qsize() if work_queue is not None else None,
+    }
+
+
+# -------------------------------
+# Remote profiling (processes without an HTTP server)
+# -------------------------------
+def process_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def control_channel(role: str) -> str:
+    # One channel per role, so PUBLISH counts exactly the processes that will answer
+    return f"{PROFILE_CONTROL_CHANNEL}:{role}"
+
+
+def request_remote_profile(redis_client, target: str, request_id: str, seconds: float,
+                           interval_ms: float = PROFILE_INTERVAL_MS, include_idle: bool = False) -> int:
+    """Ask every `target` process to profile itself; returns how many of them got it."""
+    message = {"request_id": request_id, "seconds": seconds,
+               "interval_ms": interval_ms, "include_idle": include_idle}
+    return redis_client.publish(control_channel(target), json.dumps(message))
+
+
+def collect_remote_profiles(redis_client, request_id: str) -> Dict[str, Dict]:
+    results = {}
+    for key in redis_client.scan_iter(match=f"{PROFILE_RESULT_PREFIX}{request_id}:*"):
+        key = key.decode("utf-8") if isinstance(key, bytes) else key
+        data = redis_client.get(key)
+        if data:
+            results[key[len(f"{PROFILE_RESULT_PREFIX}{request_id}:"):]] = json.loads(data)
+    return results
+
+
+def start_profile_listener(redis_client, role: str) -> threading.Thread:
+    """Answer profile requests published on the role's control channel."""
+    thread = threading.Thread(target=_listen, args=(redis_client, role), name="profile-listener", daemon=True)
+    thread.start()
+    return thread
+
+
+def _listen(redis_client, role: str):
+    while True:
+        try:
+            pubsub = redis_client.pubsub(ignore_subscribe_messages=True)
+            pubsub.subscribe(control_channel(role))
+            for message in pubsub.listen():
+                _answer(redis_client, json.loads(message["data"]))
+        except Exception as e:
+            logger.warning(f"Profile listener error: {str(e)}")
+            time.sleep(1)
+
+
+def _answer(redis_client, request: Dict):
+    try:
+        future = submit_profile(request["seconds"], request.get("interval_ms", PROFILE_INTERVAL_MS),
+                                request.get("include_idle", False))
+    except ProfilerBusy as e:
+        _store_answer(redis_client, request, {"error": str(e)})
+        return
+
+    def store(done: Future):
+        try:
+            result = done.result()
+        except Exception as e:
+            result = {"error": str(e)}
+        _store_answer(redis_client, request, result)
+
+    future.add_done_callback(store)
+
+
+def _store_answer(redis_client, request: Dict, result: Dict):
+    """Publish a profile (or its error) for collect_remote_profiles."""
+    result = {**result, "memory": process_memory()}
+    key = f"{PROFILE_RESULT_PREFIX}{request['request_id']}:{process_id()}"
+    redis_client.set(key, json.dumps(result), ex=PROFILE_RESULT_TTL)
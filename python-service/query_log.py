@@ -0,0 +1,113 @@
+# query_log.py
+import os
+import json
+import random
+import logging
+from collections import Counter
+from typing import Dict, Iterable, List
+
+logger = logging.getLogger(__name__)
+
+# -------------------------------
+# Configuration
+# -------------------------------
+QUERY_LOG_STREAM = os.getenv("QUERY_LOG_STREAM", "search_query_log")
+QUERY_LOG_SAMPLE_RATE = float(os.getenv("QUERY_LOG_SAMPLE_RATE", 0.1))
+QUERY_LOG_MAXLEN = int(os.getenv("QUERY_LOG_MAXLEN", 100000))
+STALE_DOCS_KEY = "search:stale_docs"
+DOC_QUERIES_PREFIX = "search:docs:"
+
+# Fields that identify a cache entry; replaying them rebuilds the same key
+REQUEST_FIELDS = ("query", "top_k", "use_reranking", "target_lang", "tenant_id")
+
+
+def normalize_query(query: str) -> str:
+    """Cache-key form of a query (search_cache_key) and how logged queries are grouped."""
+    return " ".join(query.strip().lower().split())
+
+
+def request_fields(req, target_lang: str) -> Dict:
+    """
+    Replayable request: the resolved target language pins the cache key.
+    The query is kept as sent, so a replay reranks exactly what the live
+    request did and still lands on the same normalized cache key.
+    """
+    return {
+        "query": req.query,
+        "top_k": req.top_k,
+        "use_reranking": req.use_reranking,
+        "target_lang": target_lang,
+        "tenant_id": req.tenant_id,
+    }
+
+
+def log_query(redis_client, req, target_lang: str, detected_lang: str, latency_ms: float, cached: bool):
+    """Append a sampled query record to the capped QUERY_LOG_STREAM."""
+    if QUERY_LOG_SAMPLE_RATE <= 0 or random.random() >= QUERY_LOG_SAMPLE_RATE:
+        return
+    try:
+        record = {k: json.dumps(v) for k, v in request_fields(req, target_lang).items()}
+        record.update({
+            "detected_lang": detected_lang,
+            "latency_ms": round(latency_ms, 1),
+            "cached": int(cached),
+        })
+        redis_client.xadd(QUERY_LOG_STREAM, record, maxlen=QUERY_LOG_MAXLEN, approximate=True)
+    except Exception as e:
+        logger.warning(f"Query log write failed: {str(e)}")
+
+
+def top_queries(redis_client, n: int, window: int = QUERY_LOG_MAXLEN) -> List[Dict]:
+    """
+    Most frequent requests among the latest `window` log records, counted
+    per cache key (normalized query); each is replayed in its latest form.
+    """
+    counts = Counter()
+    latest = {}
+    for _, fields in redis_client.xrevrange(QUERY_LOG_STREAM, count=window):
+        fields = {k.decode("utf-8"): v.decode("utf-8") for k, v in fields.items()}
+        request = {name: json.loads(fields.get(name, "null")) for name in REQUEST_FIELDS}
+        key = json.dumps({**request, "query": normalize_query(request["query"] or "")}, sort_keys=True)
+        counts[key] += 1
+        latest.setdefault(key, request)
+    return [latest[key] for key, _ in counts.most_common(n)]
+
+
+def track_cached_request(pipe, request: Dict, doc_ids: Iterable[str], ttl: int):
+    """Remember which cached requests returned each document (pipelined)."""
+    member = json.dumps(request, sort_keys=True)
+    for doc_id in doc_ids:
+        key = f"{DOC_QUERIES_PREFIX}{doc_id}"
+        pipe.sadd(key, member)
+        pipe.expire(key, ttl)
+
+
+def pop_requests_for_documents(redis_client, doc_ids: Iterable[str]) -> List[Dict]:
+    """Cached requests whose results contained any of doc_ids; clears the mapping."""
+    pipe = redis_client.pipeline()
+    for doc_id in doc_ids:
+        key = f"{DOC_QUERIES_PREFIX}{doc_id}"
+        pipe.smembers(key)
+        pipe.delete(key)
+    members = set()
+    for result in pipe.execute()[::2]:
+        members.update(result)
+    return [json.loads(member) for member in members]
+
+
+def mark_document_updated(redis_client, doc_id: str):
+    """Queue a changed document so the search service re-warms its cached queries."""
+    redis_client.rpush(STALE_DOCS_KEY, doc_id)
+
+
+def mark_documents_updated(redis_client, doc_ids: List[str]):
+    if doc_ids:
+        redis_client.rpush(STALE_DOCS_KEY, *doc_ids)
+
+
+def pop_updated_documents(redis_client, limit: int = 100) -> List[str]:
+    pipe = redis_client.pipeline()
+    pipe.lrange(STALE_DOCS_KEY, 0, limit - 1)
+    pipe.ltrim(STALE_DOCS_KEY, limit, -1)
+    doc_ids, _ = pipe.execute()
+    return [doc_id.decode("utf-8") for doc_id in doc_ids]
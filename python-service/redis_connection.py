@@ -0,0 +1,18 @@
+# redis_connection.py
+import os
+import redis
+from dotenv import load_dotenv
+
+load_dotenv()
+
+REDIS_HOST = os.getenv("REDIS_HOST", "localhost")
+REDIS_PORT = int(os.getenv("REDIS_PORT", 6379))
+REDIS_DB = int(os.getenv("REDIS_DB", 0))
+REDIS_MAX_CONNECTIONS = int(os.getenv("REDIS_MAX_CONNECTIONS", 64))
+
+# One connection pool per process, shared by every Redis client in it
+pool = redis.ConnectionPool(host=REDIS_HOST, port=REDIS_PORT, db=REDIS_DB, max_connections=REDIS_MAX_CONNECTIONS)
+
+def get_redis() -> redis.StrictRedis:
+    """Redis client backed by the process-wide connection pool."""
+    return redis.StrictRedis(connection_pool=pool)
@@ -0,0 +1,112 @@
+# serialization.py
+"""
+Pluggable serializer for Redis payloads (search cache entries, job queues).
+
+Payloads start with a one-byte header naming the codec and whether the body
+is zstd-compressed; anything without a known header is read as legacy plain
+JSON, so entries written before this module remain readable.
+Also usable as an rq serializer: Queue(..., serializer=serialization.default_serializer)
+and `rq worker --serializer serialization.default_serializer` (rq needs a
+dotted module.attribute path).
+"""
+import os
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+try:
+    import msgpack
+    MSGPACK_AVAILABLE = True
+except ImportError:
+    MSGPACK_AVAILABLE = False
+
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+# -------------------------------
+# Configuration
+# -------------------------------
+REDIS_SERIALIZER = os.getenv("REDIS_SERIALIZER", "auto")  # auto | json | orjson | msgpack
+REDIS_COMPRESS_THRESHOLD = int(os.getenv("REDIS_COMPRESS_THRESHOLD", 2048))  # bytes, 0 disables compression
+REDIS_COMPRESS_LEVEL = int(os.getenv("REDIS_COMPRESS_LEVEL", 3))
+
+CODEC_JSON = 0x01
+CODEC_MSGPACK = 0x02
+COMPRESSED = 0x10
+
+
+def _json_dumps(obj) -> bytes:
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(obj, separators=(",", ":")).encode("utf-8")
+
+
+def _json_loads(data: bytes):
+    if ORJSON_AVAILABLE:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def _resolve_codec(name: str) -> int:
+    if name == "msgpack":
+        if MSGPACK_AVAILABLE:
+            return CODEC_MSGPACK
+        logger.warning("msgpack not available, using JSON for Redis payloads")
+    if name == "orjson" and not ORJSON_AVAILABLE:
+        logger.warning("orjson not available, using stdlib json for Redis payloads")
+    return CODEC_JSON
+
+
+class Serializer:
+    """Encode/decode Redis payloads with a codec header and optional zstd."""
+
+    def __init__(self, codec: str = REDIS_SERIALIZER, compress_threshold: int = REDIS_COMPRESS_THRESHOLD,
+                 compress_level: int = REDIS_COMPRESS_LEVEL):
+        self.codec = _resolve_codec(codec)
+        self.compress_threshold = compress_threshold if ZSTD_AVAILABLE else 0
+        if self.compress_threshold:
+            self._compressor = zstandard.ZstdCompressor(level=compress_level)
+        if ZSTD_AVAILABLE:
+            self._decompressor = zstandard.ZstdDecompressor()
+
+    def dumps(self, obj) -> bytes:
+        if self.codec == CODEC_MSGPACK:
+            body = msgpack.packb(obj, use_bin_type=True)
+        else:
+            body = _json_dumps(obj)
+        header = self.codec
+        if self.compress_threshold and len(body) >= self.compress_threshold:
+            body = self._compressor.compress(body)
+            header |= COMPRESSED
+        return bytes([header]) + body
+
+    def loads(self, data):
+        if data is None:
+            return None
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        header = data[0] if data else 0
+        if header not in (CODEC_JSON, CODEC_MSGPACK, CODEC_JSON | COMPRESSED, CODEC_MSGPACK | COMPRESSED):
+            # Legacy payload written as plain JSON text
+            return _json_loads(data)
+        body = data[1:]
+        if header & COMPRESSED:
+            body = self._decompressor.decompress(body)
+        if header & ~COMPRESSED == CODEC_MSGPACK:
+            return msgpack.unpackb(body, raw=False)
+        return _json_loads(body)
+
+
+default_serializer = Serializer()
+dumps = default_serializer.dumps
+loads = default_serializer.loads
@@ -0,0 +1,186 @@
+# tenants.py
+import os
+import time
+import asyncio
+import base64
+import hashlib
+import logging
+import threading
+from typing import Dict, Optional, Tuple
+
+from pydantic import BaseModel
+from pymongo.errors import OperationFailure
+
+logger = logging.getLogger(__name__)
+
+# Optional: needed to decrypt credentials written by lib/Encryption.ts
+try:
+    from cryptography.hazmat.primitives import padding
+    from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+    DECRYPTION_AVAILABLE = True
+except ImportError:
+    DECRYPTION_AVAILABLE = False
+    logging.warning("cryptography not available. Tenant credentials will not be decrypted.")
+
+# -------------------------------
+# Configuration
+# -------------------------------
+TENANT_CACHE_TTL = int(os.getenv("TENANT_CACHE_TTL", 300))
+TENANT_INVALIDATION_CHANNEL = os.getenv("TENANT_INVALIDATION_CHANNEL", "tenant_config_invalidate")
+ENCRYPTION_KEY = os.getenv("ENCRYPTION_KEY")
+ENCRYPTION_PEPPER = os.getenv("ENCRYPTION_PEPPER", "")
+
+
+class TenantConfig(BaseModel):
+    """
+    Per-tenant settings read from the Mongo `configs` collection (one
+    document per Next.js user, see models/Config.ts). Search fields are
+    optional and fall back to the service-wide defaults.
+
+    Tenants share the service-wide Pinecone index and namespace: every
+    ingest path (webhook, worker, change stream, /reindex/all) writes there,
+    so tenant settings only change how a search is run, not what it reads.
+    """
+    tenant_id: str
+    api_key: Optional[str] = None            # Contentstack stack API key
+    access_token: Optional[str] = None       # Contentstack delivery token
+    environment: str = "production"
+    rerank_enabled: bool = True
+    translation_enabled: bool = True
+
+
+def decrypt_crypto_js(ciphertext: Optional[str]) -> Optional[str]:
+    """
+    Decrypt a CryptoJS.AES passphrase ciphertext ("Salted__" OpenSSL format,
+    EVP_BytesToKey with MD5, AES-256-CBC) as produced by encryptData().
+    """
+    if not ciphertext or not ENCRYPTION_KEY or not DECRYPTION_AVAILABLE:
+        return ciphertext
+    try:
+        raw = base64.b64decode(ciphertext)
+        if raw[:8] != b"Salted__":
+            return ciphertext
+        salt, data = raw[8:16], raw[16:]
+
+        derived, block = b"", b""
+        while len(derived) < 48:
+            block = hashlib.md5(block + ENCRYPTION_KEY.encode() + salt).digest()
+            derived += block
+        key, iv = derived[:32], derived[32:48]
+
+        decryptor = Cipher(algorithms.AES(key), modes.CBC(iv)).decryptor()
+        padded = decryptor.update(data) + decryptor.finalize()
+        unpadder = padding.PKCS7(128).unpadder()
+        plain = (unpadder.update(padded) + unpadder.finalize()).decode("utf-8")
+
+        if ENCRYPTION_PEPPER and plain.endswith(ENCRYPTION_PEPPER):
+            plain = plain[:-len(ENCRYPTION_PEPPER)]
+        return plain
+    except Exception as e:
+        # Values written through findOneAndUpdate skip the pre-save hook and are stored in plaintext
+        logger.warning(f"Credential decryption failed, using the stored value: {str(e)}")
+        return ciphertext
+
+
+def tenant_from_document(doc: Dict) -> TenantConfig:
+    return TenantConfig(
+        tenant_id=doc["userId"],
+        api_key=decrypt_crypto_js(doc.get("apiKey")),
+        access_token=decrypt_crypto_js(doc.get("accessToken")),
+        environment=doc.get("environment", "production"),
+        rerank_enabled=doc.get("rerankEnabled", True),
+        translation_enabled=doc.get("translationEnabled", True),
+    )
+
+
+class TenantRegistry:
+    """
+    In-process TTL cache of tenant configs. Entries are dropped on TTL
+    expiry, when the tenant's `configs` document changes (change stream,
+    replica sets only) or when a tenant id (or "*") is published on
+    TENANT_INVALIDATION_CHANNEL.
+    """
+
+    def __init__(self, collection, redis_client, ttl: int = TENANT_CACHE_TTL):
+        self.collection = collection
+        self.redis_client = redis_client
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._configs: Dict[str, Tuple[float, Optional[TenantConfig]]] = {}
+        self._listener: Optional[threading.Thread] = None
+        self._watcher: Optional[threading.Thread] = None
+
+    def get(self, tenant_id: str) -> Optional[TenantConfig]:
+        """Return the tenant's config, loading it from Mongo on a cache miss."""
+        now = time.monotonic()
+        entry = self._configs.get(tenant_id)
+        if entry and entry[0] > now:
+            return entry[1]
+
+        doc = self.collection.find_one({"userId": tenant_id})
+        tenant = tenant_from_document(doc) if doc else None
+        # Unknown tenants are cached too so they cannot hammer Mongo
+        with self._lock:
+            self._configs[tenant_id] = (now + self.ttl, tenant)
+        return tenant
+
+    async def get_async(self, tenant_id: str) -> Optional[TenantConfig]:
+        """get() for the event loop: cache hits return directly, misses query Mongo in a worker thread."""
+        entry = self._configs.get(tenant_id)
+        if entry and entry[0] > time.monotonic():
+            return entry[1]
+        return await asyncio.to_thread(self.get, tenant_id)
+
+    def invalidate(self, tenant_id: str = "*"):
+        with self._lock:
+            if tenant_id == "*":
+                self._configs.clear()
+            else:
+                self._configs.pop(tenant_id, None)
+        logger.info(f"♻️ Invalidated tenant config cache: {tenant_id}")
+
+    def publish_invalidation(self, tenant_id: str = "*"):
+        """Invalidate a tenant in every process subscribed to the channel."""
+        self.redis_client.publish(TENANT_INVALIDATION_CHANNEL, tenant_id)
+
+    def start_invalidation_listener(self):
+        if self._listener and self._listener.is_alive():
+            return
+        self._listener = threading.Thread(target=self._listen, name="tenant-invalidation", daemon=True)
+        self._listener.start()
+        self._watcher = threading.Thread(target=self._watch_configs, name="tenant-config-watch", daemon=True)
+        self._watcher.start()
+
+    def _listen(self):
+        while True:
+            try:
+                pubsub = self.redis_client.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(TENANT_INVALIDATION_CHANNEL)
+                for message in pubsub.listen():
+                    data = message.get("data")
+                    if isinstance(data, bytes):
+                        data = data.decode("utf-8")
+                    self.invalidate(data or "*")
+            except Exception as e:
+                # Messages may have been missed while disconnected
+                logger.warning(f"Tenant invalidation listener error: {str(e)}")
+                self.invalidate("*")
+                time.sleep(1)
+
+    def _watch_configs(self):
+        """Invalidate tenants whose `configs` document is written (e.g. by /api/config)."""
+        while True:
+            try:
+                with self.collection.watch(full_document="updateLookup") as stream:
+                    for change in stream:
+                        document = change.get("fullDocument") or {}
+                        # Deletes carry no userId
+                        self.invalidate(document.get("userId") or "*")
+            except OperationFailure as e:
+                # Standalone servers have no change streams: TTL and pub/sub only
+                logger.warning(f"Tenant config watch unavailable, relying on TTL: {str(e)}")
+                return
+            except Exception as e:
+                logger.warning(f"Tenant config watch error: {str(e)}")
+                self.invalidate("*")
+                time.sleep(1)
@@ -0,0 +1,90 @@
+import numpy as np
+import pytest
+
+from candidates import CandidateSet, DocumentSet, doc_id_for
+
+
+def match(vector_id, score, chunk_type, doc_id=None, text=""):
+    metadata = {"chunk_type": chunk_type, "text": text}
+    if doc_id:
+        metadata["doc_id"] = doc_id
+    return {"id": vector_id, "score": score, "metadata": metadata}
+
+
+@pytest.mark.parametrize("vector_id, metadata, expected", [
+    ("blt1_title", {}, "blt1"),
+    ("blt1_body_0", {}, "blt1"),
+    ("blt1_body_12", {}, "blt1"),
+    ("my_doc_body_3", {}, "my_doc"),
+    ("my_doc_title", {}, "my_doc"),
+    ("plain", {}, "plain"),
+    ("blt1_body_0", {"doc_id": "other"}, "other"),
+])
+def test_doc_id_for(vector_id, metadata, expected):
+    assert doc_id_for(vector_id, metadata) == expected
+
+
+@pytest.fixture
+def candidates():
+    return CandidateSet.from_matches([
+        match("a_body_0", 0.50, "body", text="a body 0"),
+        match("b_title", 0.70, "title", text="b title"),
+        match("a_title", 0.60, "title", text="a title"),
+        match("a_body_1", 0.90, "body", text="a body 1"),
+        match("b_body_0", 0.65, "body", text="b body 0"),
+    ])
+
+
+def test_max_mode_scores_by_best_chunk(candidates):
+    docs = candidates.aggregate("max")
+    assert list(docs.ids) == ["a", "b"]
+    np.testing.assert_allclose(docs.scores, [0.90, 0.70])
+    assert list(docs.chunk_matches) == [3, 2]
+
+
+def test_sum_mode_weights_title_chunks(candidates):
+    docs = candidates.aggregate("sum", title_boost=2.0)
+    assert list(docs.ids) == ["a", "b"]
+    np.testing.assert_allclose(docs.scores, [0.50 + 0.90 + 2 * 0.60, 0.65 + 2 * 0.70])
+
+
+def test_sum_mode_can_reorder_documents():
+    candidates = CandidateSet.from_matches([
+        match("a_body_0", 0.90, "body"),
+        match("b_body_0", 0.60, "body"),
+        match("b_body_1", 0.60, "body"),
+    ])
+    assert list(candidates.aggregate("max").ids) == ["a", "b"]
+    assert list(candidates.aggregate("sum").ids) == ["b", "a"]
+
+
+@pytest.mark.parametrize("mode", ["max", "sum"])
+def test_metadata_comes_from_best_chunk(candidates, mode):
+    docs = candidates.aggregate(mode)
+    texts = {doc_id: metadata["text"] for doc_id, metadata in zip(docs.ids, docs.metadata)}
+    # Best chunk is not the first one seen for either document
+    assert texts == {"a": "a body 1", "b": "b title"}
+
+
+def test_aggregate_empty():
+    docs = CandidateSet.from_matches([]).aggregate()
+    assert len(docs) == 0
+    assert docs.to_results() == []
+
+
+def test_with_reranker_scores_reorders_and_takes_over_final_score(candidates):
+    docs = candidates.aggregate("max").with_reranker_scores([0.1, 0.8])
+    assert list(docs.ids) == ["b", "a"]
+    np.testing.assert_allclose(docs.final_scores, [0.8, 0.1])
+    results = docs.to_results()
+    assert results[0]["id"] == "b"
+    assert results[0]["final_score"] == pytest.approx(0.8)
+    assert results[0]["score"] == pytest.approx(0.70)
+
+
+def test_top_and_take(candidates):
+    docs = candidates.aggregate("max")
+    assert list(docs.top(1).ids) == ["a"]
+    assert list(docs.top(10).ids) == ["a", "b"]
+    assert isinstance(docs.take([1]), DocumentSet)
+    assert list(docs.take([1]).ids) == ["b"]
@@ -0,0 +1,42 @@
+import pytest
+
+from degradation import MAX_CONCURRENT_SEARCHES, TRANSLATE_MS_PER_HIT, SearchBudget, StageTracker
+
+
+def test_try_admit_counts_batch_units():
+    tracker = StageTracker()
+    assert tracker.try_admit(MAX_CONCURRENT_SEARCHES - 1)
+    assert tracker.try_admit()
+    assert not tracker.try_admit()
+    assert tracker.shed_count == 1
+    tracker.release(MAX_CONCURRENT_SEARCHES - 1)
+    assert tracker.in_flight["search"] == 1
+    assert not tracker.try_admit(MAX_CONCURRENT_SEARCHES)
+
+
+def test_idle_tracker_admits_batch_wider_than_cap():
+    tracker = StageTracker()
+    assert tracker.try_admit(MAX_CONCURRENT_SEARCHES + 10)
+    assert not tracker.try_admit()
+    tracker.release(MAX_CONCURRENT_SEARCHES + 10)
+    assert tracker.in_flight["search"] == 0
+
+
+def test_skipped_stage_estimate_decays_to_default():
+    tracker = StageTracker()
+    tracker.cost_ms["translate"] = 3 * TRANSLATE_MS_PER_HIT
+    for _ in range(50):
+        tracker.skipped("translate")
+    assert tracker.cost_ms["translate"] == pytest.approx(TRANSLATE_MS_PER_HIT, rel=1e-3)
+
+
+def test_slow_translations_do_not_disable_stages_for_good():
+    tracker = StageTracker()
+    tracker.cost_ms["translate"] = 2232.0  # after a few 3 s translations
+    budget = SearchBudget(2000, tracker)
+    assert budget.rerank_depth(50, 5, translate=True) > 0
+    assert not budget.allow_translation()
+
+    for _ in range(20):
+        SearchBudget(2000, tracker).allow_translation()
+    assert SearchBudget(2000, tracker).allow_translation()
@@ -0,0 +1,83 @@
+from documents import collapse_changes, plan_changes, touches_indexed_fields
+
+
+def doc(_id, uid, title="Title", body="Body"):
+    return {"_id": _id, "uid": uid, "title": title, "body": body}
+
+
+def insert(_id, uid, **fields):
+    return {"operationType": "insert", "documentKey": {"_id": _id}, "fullDocument": doc(_id, uid, **fields)}
+
+
+def update(_id, uid, updated=None, removed=None, full_document=True):
+    return {
+        "operationType": "update",
+        "documentKey": {"_id": _id},
+        "updateDescription": {"updatedFields": updated or {}, "removedFields": removed or []},
+        "fullDocument": doc(_id, uid) if full_document else None,
+    }
+
+
+def delete(_id, before=None):
+    change = {"operationType": "delete", "documentKey": {"_id": _id}}
+    if before:
+        change["fullDocumentBeforeChange"] = before
+    return change
+
+
+def test_touches_indexed_fields():
+    assert touches_indexed_fields(update(1, "a", updated={"body": "new"}))
+    assert touches_indexed_fields(update(1, "a", updated={"title.en": "nested"}))
+    assert touches_indexed_fields(update(1, "a", removed=["locale"]))
+    assert not touches_indexed_fields(update(1, "a", updated={"views": 3, "updated_at": "now"}))
+    assert not touches_indexed_fields(update(1, "a"))
+    assert touches_indexed_fields(insert(1, "a"))
+    assert touches_indexed_fields(delete(1))
+
+
+def test_collapse_keeps_last_relevant_change_per_document_in_stream_order():
+    changes = [
+        insert(1, "a"),
+        insert(2, "b"),
+        update(1, "a", updated={"body": "x"}),
+        update(2, "b", updated={"views": 1}),  # irrelevant, keeps the insert
+        {"operationType": "invalidate"},
+        delete(3),
+    ]
+    collapsed = collapse_changes(changes)
+    assert list(collapsed) == ["2", "1", "3"]
+    assert collapsed["1"]["operationType"] == "update"
+    assert collapsed["2"]["operationType"] == "insert"
+
+
+def test_collapse_delete_after_insert_wins():
+    collapsed = collapse_changes([insert(1, "a"), delete(1)])
+    assert [c["operationType"] for c in collapsed.values()] == ["delete"]
+
+
+def test_plan_resolves_deletes_through_known_uids_not_object_id():
+    plan = plan_changes([delete("oid1")], {"oid1": "blt123"})
+    assert plan["deleted"] == [("oid1", "blt123")]
+    assert plan["unresolved"] == []
+
+
+def test_plan_prefers_pre_image_and_never_guesses():
+    plan = plan_changes([delete("oid1", before=doc("oid1", "blt9")), delete("oid2")], {})
+    assert plan["deleted"] == [("oid1", "blt9")]
+    assert plan["unresolved"] == ["oid2"]
+
+
+def test_plan_splits_inserts_and_updates_and_deletes_old_uid_on_change():
+    changes = [insert("o1", "a"), update("o2", "b-new", updated={"uid": "b-new"})]
+    plan = plan_changes(changes, {"o2": "b-old"})
+    assert [(i, d["uid"]) for i, d in plan["new"]] == [("o1", "a")]
+    assert [(i, d["uid"]) for i, d in plan["updated"]] == [("o2", "b-new")]
+    assert plan["deleted"] == [("o2", "b-old")]
+
+
+def test_plan_skips_lookups_of_deleted_documents_and_empty_documents():
+    changes = [
+        update("o1", "a", updated={"body": "x"}, full_document=False),
+        insert("o2", "b", title="", body=""),
+    ]
+    assert plan_changes(changes, {}) == {"new": [], "updated": [], "deleted": [], "unresolved": []}
@@ -0,0 +1,29 @@
+import pytest
+
+from language_detection import detect_language
+
+
+@pytest.mark.parametrize("query, expected", [
+    # Short Devanagari queries with no clear n-gram winner default to Hindi
+    ("नमस्ते", "hi"),
+    ("मौसम", "hi"),
+    ("दिल्ली मौसम", "hi"),
+    ("समाचार", "hi"),
+    ("भारत में सबसे अच्छा खाना", "hi"),
+    ("मी आज बाजारात जात आहे", "mr"),
+    ("मुंबई मध्ये स्वस्त जेवण कुठे मिळेल", "mr"),
+    ("हामीलाई पानीको आवश्यकता छ", "ne"),
+    ("काठमाडौंमा राम्रो होटल कहाँ छ", "ne"),
+    ("the weather", "en"),
+    # English queries with borrowed words; Latin languages without translation support are English
+    ("piano lessons", "en"),
+    ("mobile", "en"),
+    ("namaste", "en"),
+    ("data science", "en"),
+    ("pasta recipe", "en"),
+    ("el tiempo hoy", "en"),
+    ("சென்னை வானிலை", "ta"),
+    ("12345", "en"),
+])
+def test_detect_language(query, expected):
+    assert detect_language(query) == expected
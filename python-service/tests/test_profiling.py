@@ -0,0 +1,22 @@
+import pytest
+
+import profiling
+
+
+def test_second_profile_is_rejected_instead_of_queued():
+    running = profiling.submit_profile(0.3, interval_ms=5)
+    with pytest.raises(profiling.ProfilerBusy):
+        profiling.submit_profile(0.3)
+    with pytest.raises(profiling.ProfilerBusy):
+        profiling.sample_stacks(0.3)
+    assert running.result(timeout=5)["samples"] > 0
+    assert profiling.submit_profile(0.1).result(timeout=5)["samples"] > 0
+
+
+def test_snapshots_do_not_wait_behind_a_profile():
+    running = profiling.submit_profile(1.0, interval_ms=5)
+    try:
+        status = profiling.snapshot_executor.submit(profiling.tracing_status).result(timeout=0.5)
+        assert "tracing" in status
+    finally:
+        running.result(timeout=5)
@@ -0,0 +1,39 @@
+import json
+from types import SimpleNamespace
+
+from query_log import normalize_query, request_fields, top_queries
+
+
+class FakeStream:
+    def __init__(self, records):
+        self.records = records  # oldest first, as XADD appends
+
+    def xrevrange(self, stream, count=None):
+        encoded = [
+            {k.encode(): json.dumps(v).encode() for k, v in record.items()}
+            for record in reversed(self.records)
+        ]
+        return list(enumerate(encoded))[:count]
+
+
+def search_request(query, **overrides):
+    fields = {"query": query, "top_k": 5, "use_reranking": True, "target_lang": None, "tenant_id": None}
+    return SimpleNamespace(**{**fields, **overrides})
+
+
+def test_normalize_query_collapses_case_and_whitespace():
+    assert normalize_query("  Cheap   Flights\tto Goa ") == "cheap flights to goa"
+
+
+def test_request_fields_keep_the_query_as_sent():
+    assert request_fields(search_request("Cheap  Flights"), "en")["query"] == "Cheap  Flights"
+
+
+def test_top_queries_group_by_cache_key_and_replay_latest_form():
+    records = [
+        request_fields(search_request("cheap flights"), "en"),
+        request_fields(search_request("Cheap  Flights"), "en"),
+        request_fields(search_request("weather"), "en"),
+    ]
+    head = top_queries(FakeStream(records), 2)
+    assert [r["query"] for r in head] == ["Cheap  Flights", "weather"]
@@ -0,0 +1,28 @@
+import pytest
+
+pytest.importorskip("google.generativeai")
+
+from language_detection import SUPPORTED_LANGUAGES
+from translation import LANG_MAP, _complete_translations, document_version
+
+
+def test_detection_covers_translation_languages():
+    assert SUPPORTED_LANGUAGES == set(LANG_MAP)
+
+
+def test_version_changes_with_languages():
+    assert document_version("Title", "Body", ["hi", "ta"]) == document_version("Title", "Body", ["ta", "hi"])
+    assert document_version("Title", "Body", ["hi"]) != document_version("Title", "Body", ["hi", "ta"])
+
+
+def test_complete_translations_needs_every_language():
+    doc = {"id": "a", "title": "Title", "preview": "Body", "version": "v1"}
+    per_lang = {"hi": {"title": "T", "preview": "P"}}
+    assert _complete_translations(doc, per_lang, ["hi"]) == {"version": "v1", "hi:title": "T", "hi:preview": "P"}
+    assert _complete_translations(doc, per_lang, ["hi", "ta"]) is None
+    assert _complete_translations(doc, {"hi": {"title": "T", "preview": " "}}, ["hi"]) is None
+
+
+def test_complete_translations_skips_empty_source_fields():
+    doc = {"id": "a", "title": "", "preview": "Body", "version": "v1"}
+    assert _complete_translations(doc, {"hi": {"preview": "P"}}, ["hi"]) == {"version": "v1", "hi:preview": "P"}
@@ -0,0 +1,290 @@
+# translation.py
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import google.generativeai as genai
+from dotenv import load_dotenv
+
+load_dotenv()
+logger = logging.getLogger(__name__)
+
+GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
+genai.configure(api_key=GEMINI_API_KEY)
+GEMINI_MODEL = "gemini-1.5-pro"
+
+LANG_MAP = {
+    "en": "English",
+    "mr": "Marathi",
+    "hi": "Hindi", 
+    "kn": "Kannada",
+    "ta": "Tamil",
+    "te": "Telugu",
+    "gu": "Gujarati",
+    "bn": "Bengali",
+    "pa": "Punjabi",
+    "ml": "Malayalam",
+    "or": "Odia",
+    "ur": "Urdu",
+    "ne": "Nepali"
+}
+
+PREVIEW_CHARS = 200
+
+# Index-time pre-translation (comma-separated language codes from LANG_MAP, empty to disable)
+PRETRANSLATE_LANGS = [
+    lang.strip() for lang in os.getenv("PRETRANSLATE_LANGS", "").split(",")
+    if lang.strip() in LANG_MAP and lang.strip() != "en"
+]
+PRETRANSLATE_BATCH_SIZE = int(os.getenv("PRETRANSLATE_BATCH_SIZE", 10))  # documents per LLM call
+PRETRANSLATE_MIN_INTERVAL = float(os.getenv("PRETRANSLATE_MIN_INTERVAL", 1.0))  # seconds between LLM calls
+PRETRANSLATE_POLL_INTERVAL = float(os.getenv("PRETRANSLATE_POLL_INTERVAL", 2))  # seconds between empty queue polls
+TRANSLATION_KEY_PREFIX = "translations:"
+PRETRANSLATE_QUEUE_KEY = "translations:pending"
+
+
+def content_preview(text: str) -> str:
+    """The preview that gets translated: first PREVIEW_CHARS characters."""
+    return text[:PREVIEW_CHARS] + "..." if len(text) > PREVIEW_CHARS else text
+
+
+async def translate_text(text: str, target_lang: str) -> str:
+    """
+    Translate given text into target_lang using Gemini with strict chat instructions.
+    """
+    if not text or not target_lang or target_lang == "en":
+        return text
+
+    target_lang_full = LANG_MAP.get(target_lang, "English")
+
+    try:
+        model = genai.GenerativeModel(GEMINI_MODEL)
+        
+        # Start a chat with very clear system instructions
+        chat = model.start_chat(history=[
+            {
+                "role": "user",
+                "parts": ["You are a translation machine. Your only function is to translate text. Never provide explanations, options, or additional text. Only output the translated text."]
+            },
+            {
+                "role": "model", 
+                "parts": ["Understood. I will only output the translated text with no additional content, explanations, or options."]
+            },
+            {
+                "role": "user",
+                "parts": ["Translate 'Hello world' to Hindi"]
+            },
+            {
+                "role": "model",
+                "parts": ["नमस्ते दुनिया"]
+            }
+        ])
+        
+        prompt = f"Translate this to {target_lang_full}: {text}"
+        response = await chat.send_message_async(prompt)
+        translated = response.text.strip()
+        
+        return translated
+
+    except Exception as e:
+        logger.warning(f"Translation failed: {str(e)}")
+        return text
+
+# -------------------------------
+# Index-time pre-translation
+# -------------------------------
+class RateLimiter:
+    """Process-wide minimum interval between calls."""
+
+    def __init__(self, min_interval: float):
+        self.min_interval = min_interval
+        self._lock = threading.Lock()
+        self._next_at = 0.0
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            delay = self._next_at - now
+            self._next_at = max(now, self._next_at) + self.min_interval
+        if delay > 0:
+            time.sleep(delay)
+
+
+pretranslate_limiter = RateLimiter(PRETRANSLATE_MIN_INTERVAL)
+
+
+def document_version(title: str, preview: str, langs: List[str]) -> str:
+    """Changes with the translated text and with the language set, so new languages get backfilled."""
+    key = "\0".join([title, preview, ",".join(sorted(langs))])
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()[:16]
+
+
+def _complete_translations(doc: Dict, per_lang: Dict, langs: List[str]) -> Optional[Dict[str, str]]:
+    """Hash fields for a document, or None unless every language has every non-empty field."""
+    fields = {"version": doc["version"]}
+    for lang in langs:
+        entry = per_lang.get(lang) or {}
+        for field in ("title", "preview"):
+            if not doc[field]:
+                continue
+            if not isinstance(entry.get(field), str) or not entry[field].strip():
+                return None
+            fields[f"{lang}:{field}"] = entry[field]
+    return fields
+
+
+def _translate_documents(docs: List[Dict], langs: List[str]) -> Dict:
+    """
+    One Gemini call for a batch of documents and languages. Returns
+    {doc_id: {lang: {"title": ..., "preview": ...}}}.
+    """
+    languages = ", ".join(f"{lang} ({LANG_MAP[lang]})" for lang in langs)
+    payload = [{"id": d["id"], "title": d["title"], "preview": d["preview"]} for d in docs]
+    prompt = (
+        f"Translate the title and preview of each document into these languages: {languages}.\n"
+        'Return ONLY a JSON object of the form {"<id>": {"<lang code>": {"title": "...", "preview": "..."}}}.\n'
+        f"Documents: {json.dumps(payload, ensure_ascii=False)}"
+    )
+    pretranslate_limiter.wait()
+    model = genai.GenerativeModel(GEMINI_MODEL)
+    response = model.generate_content(prompt, generation_config={"response_mime_type": "application/json"})
+    return json.loads(response.text)
+
+
+def pretranslate_documents(redis_client, docs: List[Tuple[str, str, str]], langs: Optional[List[str]] = None) -> int:
+    """
+    Store translated titles and previews for (doc_id, title, body) tuples in
+    the `translations:<doc_id>` Redis hash, once per document version.
+    Returns the number of documents translated.
+    """
+    return len(_pretranslate(redis_client, docs, langs))
+
+
+def _pretranslate(redis_client, docs: List[Tuple[str, str, str]], langs: Optional[List[str]] = None) -> List[str]:
+    """pretranslate_documents, returning the IDs of the documents stored."""
+    langs = PRETRANSLATE_LANGS if langs is None else langs
+    if not langs or not docs:
+        return []
+
+    pending = []
+    for doc_id, title, body in docs:
+        preview = content_preview(body or title or "")
+        version = document_version(title or "", preview, langs)
+        stored = redis_client.hget(f"{TRANSLATION_KEY_PREFIX}{doc_id}", "version")
+        if stored and stored.decode("utf-8") == version:
+            continue
+        pending.append({"id": doc_id, "title": title or "", "preview": preview, "version": version})
+
+    translated = []
+    for i in range(0, len(pending), PRETRANSLATE_BATCH_SIZE):
+        batch = pending[i:i + PRETRANSLATE_BATCH_SIZE]
+        try:
+            result = _translate_documents(batch, langs)
+        except Exception as e:
+            logger.warning(f"Pre-translation failed for {len(batch)} documents: {str(e)}")
+            continue
+
+        pipe = redis_client.pipeline()
+        incomplete = []
+        for doc in batch:
+            fields = _complete_translations(doc, result.get(doc["id"]) or {}, langs)
+            if fields is None:
+                # Keep the previous translations and version, so the document is retried
+                incomplete.append(doc["id"])
+                continue
+            key = f"{TRANSLATION_KEY_PREFIX}{doc['id']}"
+            pipe.delete(key)
+            pipe.hset(key, mapping=fields)
+            translated.append(doc["id"])
+        pipe.execute()
+        if incomplete:
+            logger.warning(f"Pre-translation incomplete for {len(incomplete)} documents, kept previous: {incomplete}")
+
+    if translated:
+        logger.info(f"🌐 Pre-translated {len(translated)} documents into {langs}")
+    return translated
+
+
+# Single-document sources (webhooks, queued jobs) go through PRETRANSLATE_QUEUE_KEY
+# so their LLM calls are batched and rate limited by one consumer, not per request.
+def queue_pretranslation(redis_client, docs: List[Tuple[str, str, str]]) -> int:
+    """Queue (doc_id, title, body) tuples for the pre-translation consumer."""
+    if not PRETRANSLATE_LANGS or not docs:
+        return 0
+    redis_client.rpush(PRETRANSLATE_QUEUE_KEY, *(json.dumps(list(doc), ensure_ascii=False) for doc in docs))
+    return len(docs)
+
+
+def pop_pretranslation_batch(redis_client, limit: int = PRETRANSLATE_BATCH_SIZE) -> List[Tuple[str, str, str]]:
+    """Take up to `limit` queued documents; a document queued twice keeps its latest version."""
+    pipe = redis_client.pipeline()
+    pipe.lrange(PRETRANSLATE_QUEUE_KEY, 0, limit - 1)
+    pipe.ltrim(PRETRANSLATE_QUEUE_KEY, limit, -1)
+    entries, _ = pipe.execute()
+    latest = {}
+    for entry in entries:
+        doc_id, title, body = json.loads(entry)
+        latest.pop(doc_id, None)
+        latest[doc_id] = (doc_id, title, body)
+    return list(latest.values())
+
+
+def drain_pretranslation_queue(redis_client, on_translated=None) -> int:
+    """
+    Translate one batch from the queue. on_translated receives the IDs of
+    the documents stored (e.g. to re-warm their cached queries).
+    Returns the number of documents taken from the queue.
+    """
+    docs = pop_pretranslation_batch(redis_client)
+    if docs:
+        translated = _pretranslate(redis_client, docs)
+        if translated and on_translated:
+            on_translated(translated)
+    return len(docs)
+
+
+def pretranslation_loop(redis_client, on_translated=None):
+    """Drain the queue forever, polling every PRETRANSLATE_POLL_INTERVAL seconds when it is empty."""
+    logger.info(f"🌐 Pre-translating queued documents into {PRETRANSLATE_LANGS}")
+    while True:
+        try:
+            if drain_pretranslation_queue(redis_client, on_translated):
+                continue
+        except Exception as e:
+            logger.warning(f"Pre-translation queue error: {str(e)}")
+        time.sleep(PRETRANSLATE_POLL_INTERVAL)
+
+
+def get_pretranslations(redis_client, doc_ids: List[str], lang: str) -> Dict[str, Dict[str, str]]:
+    """Stored {"title", "preview"} translations for doc_ids in one pipelined round trip."""
+    if not doc_ids or lang not in PRETRANSLATE_LANGS:
+        return {}
+    pipe = redis_client.pipeline()
+    for doc_id in doc_ids:
+        pipe.hmget(f"{TRANSLATION_KEY_PREFIX}{doc_id}", f"{lang}:title", f"{lang}:preview")
+    found = {}
+    for doc_id, (title, preview) in zip(doc_ids, pipe.execute()):
+        if title or preview:
+            found[doc_id] = {
+                "title": title.decode("utf-8") if title else None,
+                "preview": preview.decode("utf-8") if preview else None,
+            }
+    return found
+
+
+def delete_pretranslations(redis_client, doc_id: str):
+    redis_client.delete(f"{TRANSLATION_KEY_PREFIX}{doc_id}")
+
+
+if __name__ == "__main__":
+    # Standalone consumer for deployments without app.py (which drains the queue itself)
+    from redis_connection import get_redis
+    from query_log import mark_documents_updated
+
+    logging.basicConfig(level=logging.INFO)
+    redis_client = get_redis()
+    pretranslation_loop(redis_client, lambda doc_ids: mark_documents_updated(redis_client, doc_ids))
@@ -1,6 +1,40 @@
+import os
 import re
+import json
+import time
+import threading
+
+WEBHOOK_RECORD_PATH = os.getenv("WEBHOOK_RECORD_PATH")  # optional: JSONL capture of raw webhook payloads for loadgen.py
+INGEST_METRICS_STREAM = os.getenv("INGEST_METRICS_STREAM")  # optional: per-event ingestion timings for loadgen.py
+INGEST_METRICS_MAXLEN = int(os.getenv("INGEST_METRICS_MAXLEN", 100000))
+_record_lock = threading.Lock()
 
 def strip_html_tags(text: str) -> str:
     """Remove HTML tags from a string."""
     clean = re.compile("<.*?>")
     return re.sub(clean, "", text or "").strip()
+
+def record_webhook_payload(payload: dict):
+    """Append a raw webhook payload to WEBHOOK_RECORD_PATH when capture is enabled."""
+    if not WEBHOOK_RECORD_PATH:
+        return
+    with _record_lock, open(WEBHOOK_RECORD_PATH, "a", encoding="utf-8") as f:
+        f.write(json.dumps(payload) + "\n")
+
+def record_ingest_metrics(redis_client, source: str, uid: str, event: str, enqueued_at: float, started_at: float, cpu_ms: float):
+    """
+    Append one ingestion timing record to INGEST_METRICS_STREAM. source is
+    "api" (chunked indexing in the webhook handler) or "worker" (queued job).
+    cpu_ms is process CPU, so it includes other threads busy at the same time.
+    """
+    if not INGEST_METRICS_STREAM:
+        return
+    redis_client.xadd(INGEST_METRICS_STREAM, {
+        "source": source,
+        "uid": uid,
+        "event": event or "",
+        "enqueued_at": enqueued_at,
+        "started_at": started_at,
+        "finished_at": time.time(),
+        "cpu_ms": cpu_ms,
+    }, maxlen=INGEST_METRICS_MAXLEN, approximate=True)
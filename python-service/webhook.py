@@ -1,23 +1,20 @@
-import os
 import logging
 import re
 from fastapi import FastAPI, Request, BackgroundTasks
-from sentence_transformers import SentenceTransformer
-from pinecone import Pinecone
 from dotenv import load_dotenv
+from embedding_client import encode_texts
+from pinecone_client import upsert_vectors, delete_vectors
+from translation import queue_pretranslation, delete_pretranslations
+from query_log import mark_document_updated
+from redis_connection import get_redis
 
 load_dotenv()
 
 app = FastAPI()
 logging.basicConfig(level=logging.INFO)
 
-# Load embedding model (same as indexing.py)
-model = SentenceTransformer("sentence-transformers/all-mpnet-base-v2")
-
-# Pinecone setup
-pc = Pinecone(api_key=os.getenv("PINECONE_API_KEY"))
-index_name = os.getenv("PINECONE_INDEX")
-index = pc.Index(index_name)
+# Redis holds index-time translations read by /search
+redis_client = get_redis()
 
 
 def strip_html_tags(text: str) -> str:
@@ -48,20 +45,24 @@ def process_webhook(payload: dict):
 
         # Combine title + body
         text_to_embed = f"{title} {body}".strip()
-        vector = model.encode(text_to_embed).tolist()
+        vector = encode_texts([text_to_embed])[0]
         vector_id = f"{locale}_{uid}"
 
         metadata = {"title": title, "body": body, "locale": locale, "content_type": content_type}
 
         # Handle create/update
         if event in ["create", "update", "entry.create", "entry.update"]:
-            index.upsert([{"id": vector_id, "values": vector, "metadata": metadata}])
+            upsert_vectors([{"id": vector_id, "values": vector, "metadata": metadata}])
             logging.info(f"✅ Upserted entry {vector_id} into Pinecone")
+            queue_pretranslation(redis_client, [(vector_id, title, body)])
+            mark_document_updated(redis_client, vector_id)
 
         # Handle delete
         elif event in ["delete", "entry.delete"]:
-            index.delete(ids=[vector_id])
+            delete_vectors([vector_id])
             logging.info(f"🗑️ Deleted entry {vector_id} from Pinecone")
+            delete_pretranslations(redis_client, vector_id)
+            mark_document_updated(redis_client, vector_id)
 
         else:
             logging.warning(f"⚠️ Unhandled event type: {event}")
@@ -1,25 +1,26 @@
 import os
-import json
 import time
+import socket
 import logging
-import redis
-from sentence_transformers import SentenceTransformer
-from pinecone import Pinecone
 from dotenv import load_dotenv
+import serialization
+from redis_connection import get_redis
+from embedding_client import encode_texts
+from pinecone_client import upsert_vectors, delete_vectors
+from translation import queue_pretranslation, delete_pretranslations
+from query_log import mark_document_updated
+from utils import record_ingest_metrics
+from profiling import start_profile_listener
 
 load_dotenv()
 logging.basicConfig(level=logging.INFO)
 
 # Redis connection
-redis_client = redis.StrictRedis(host="localhost", port=6379, db=0)
-
-# Load embedding model
-model = SentenceTransformer("sentence-transformers/all-mpnet-base-v2")
-
-# Pinecone setup
-pc = Pinecone(api_key=os.getenv("PINECONE_API_KEY"))
-index_name = os.getenv("PINECONE_INDEX")
-index = pc.Index(index_name)
+redis_client = get_redis()
+JOB_QUEUE = "contentstack_jobs"
+WORKER_POP_BATCH = int(os.getenv("WORKER_POP_BATCH", 16))  # jobs taken per queue round trip
+# Jobs taken but not finished; requeued when a worker on this host starts again (needs Redis 6.2+ for LMOVE)
+PROCESSING_QUEUE = os.getenv("WORKER_PROCESSING_QUEUE", f"{JOB_QUEUE}:processing:{socket.gethostname()}")
 
 def process_job(job_data: dict):
     """Process a single job: embed + Pinecone upsert/delete."""
@@ -31,7 +32,7 @@ def process_job(job_data: dict):
     event = job_data["event"]
 
     text_to_embed = f"{title} {body}".strip()
-    vector = model.encode(text_to_embed).tolist()
+    vector = encode_texts([text_to_embed])[0]
     vector_id = f"{locale}_{uid}"
 
     metadata = {
@@ -42,26 +43,76 @@ def process_job(job_data: dict):
     }
 
     if event in ["create", "update", "entry.create", "entry.update"]:
-        index.upsert([{"id": vector_id, "values": vector, "metadata": metadata}])
+        upsert_vectors([{"id": vector_id, "values": vector, "metadata": metadata}])
         logging.info(f"✅ Upserted entry {vector_id} into Pinecone")
+        queue_pretranslation(redis_client, [(vector_id, title, body)])
+        mark_document_updated(redis_client, vector_id)
 
     elif event in ["delete", "entry.delete"]:
-        index.delete(ids=[vector_id])
+        delete_vectors([vector_id])
         logging.info(f"🗑️ Deleted entry {vector_id} from Pinecone")
+        delete_pretranslations(redis_client, vector_id)
+        mark_document_updated(redis_client, vector_id)
 
     else:
         logging.warning(f"⚠️ Unhandled event type: {event}")
 
+def record_job_metrics(job_data: dict, started_at: float, cpu_ms: float):
+    """Queue wait, processing time and CPU for one job (INGEST_METRICS_STREAM, see loadgen.py)."""
+    record_ingest_metrics(redis_client, "worker", job_data["uid"], job_data.get("event"),
+                          job_data.get("enqueued_at", started_at), started_at, cpu_ms)
+
+def process_entry(job_data: dict):
+    """Entry point for queued jobs (worker_loop and the rq queue used by main.py)."""
+    started_at = time.time()
+    cpu_start = time.process_time()
+    process_job(job_data)
+    record_job_metrics(job_data, started_at, (time.process_time() - cpu_start) * 1000)
+
+def pop_jobs() -> list:
+    """
+    Block for one job, then take up to WORKER_POP_BATCH - 1 more in one
+    pipelined round trip. Jobs are moved to PROCESSING_QUEUE, not removed,
+    until finish_job; returns the raw payloads.
+    """
+    first = redis_client.blmove(JOB_QUEUE, PROCESSING_QUEUE, 0, "LEFT", "RIGHT")  # blocking move
+    pipe = redis_client.pipeline(transaction=False)
+    for _ in range(WORKER_POP_BATCH - 1):
+        pipe.lmove(JOB_QUEUE, PROCESSING_QUEUE, "LEFT", "RIGHT")
+    rest = pipe.execute() if WORKER_POP_BATCH > 1 else []
+    return [first, *(job_bytes for job_bytes in rest if job_bytes is not None)]
+
+def finish_job(job_bytes: bytes):
+    redis_client.lrem(PROCESSING_QUEUE, 1, job_bytes)
+
+def requeue_unfinished_jobs() -> int:
+    """Put jobs left in PROCESSING_QUEUE by a crashed worker back at the head of the queue."""
+    requeued = 0
+    while redis_client.lmove(PROCESSING_QUEUE, JOB_QUEUE, "RIGHT", "LEFT") is not None:
+        requeued += 1
+    if requeued:
+        logging.warning(f"♻️ Requeued {requeued} unfinished jobs from {PROCESSING_QUEUE}")
+    return requeued
+
 def worker_loop():
     logging.info("🚀 Worker started, waiting for jobs...")
+    requeue_unfinished_jobs()
     while True:
-        _, job_json = redis_client.blpop("contentstack_jobs")  # blocking pop
-        job = json.loads(job_json)
-        logging.info(f"⚡ Processing job: {job['uid']}")
-        try:
-            process_job(job)
-        except Exception as e:
-            logging.error(f"❌ Failed to process job {job['uid']}: {str(e)}")
+        for job_bytes in pop_jobs():
+            try:
+                job = serialization.loads(job_bytes)
+            except Exception as e:
+                # Cannot succeed on retry; drop this job only
+                logging.error(f"❌ Dropping undecodable job: {str(e)}")
+                finish_job(job_bytes)
+                continue
+            logging.info(f"⚡ Processing job: {job['uid']}")
+            try:
+                process_entry(job)
+            except Exception as e:
+                logging.error(f"❌ Failed to process job {job['uid']}: {str(e)}")
+            finish_job(job_bytes)
 
 if __name__ == "__main__":
+    start_profile_listener(redis_client, "worker")
     worker_loop()